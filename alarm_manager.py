@@ -1,24 +1,96 @@
 # alarm_manager.py
-from PyQt6.QtCore import QTimer, QThread, pyqtSignal
-from services.task_service import get_tasks_with_alarms, remove_alarm
-from datetime import datetime
+import threading
+import time
+from PyQt6.QtCore import QThread, pyqtSignal
+from services.alarm_scheduler import AlarmScheduler
+from services.task_service import (
+    get_pending_alarms, advance_alarms, add_change_listener, remove_change_listener
+)
 
 class AlarmManager(QThread):
-    alarm_triggered = pyqtSignal(int, str)  # task_id, text
+    # все будильники, сработавшие за один проход: список (task_id, text)
+    alarms_triggered = pyqtSignal(list)
+
+    # верхняя граница сна: страхует от перевода часов и выхода из спящего режима
+    MAX_WAIT = 60
 
     def __init__(self):
         super().__init__()
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.check_alarms)
-        self.timer.start(10000)  # проверка каждые 10 секунд
+        self.scheduler = AlarmScheduler()
+        self._cond = threading.Condition(threading.RLock())
+        self._stopping = False
+        # база читается один раз при старте и после импорта или массовых
+        # изменений в другом процессе (services/change_feed.py)
+        self._reload = True
+        self._pending = None  # изменения, пришедшие во время загрузки
+        add_change_listener(self.on_tasks_changed)
 
     def run(self):
-        self.exec()
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                reload, self._reload = self._reload, False
+                if reload:
+                    self._pending = []
+            if reload:
+                self.load()
+            self.check_alarms()
+            with self._cond:
+                if self._stopping or self._reload:
+                    continue
+                deadline = self.scheduler.next_deadline()
+                if deadline is None:
+                    timeout = self.MAX_WAIT
+                else:
+                    timeout = min(max(deadline - time.time(), 0), self.MAX_WAIT)
+                if timeout > 0:
+                    self._cond.wait(timeout)
+
+    def load(self):
+        # чтение базы и сборка кучи — вне блокировки: on_tasks_changed
+        # вызывается и из GUI-потока. Изменения, пришедшие за это время,
+        # применяются поверх нового планировщика (как TaskRepository.load)
+        scheduler = AlarmScheduler()
+        try:
+            scheduler.load(get_pending_alarms())
+        except Exception as e:
+            print(f"Ошибка при загрузке будильников: {e}")
+            scheduler = self.scheduler
+        with self._cond:
+            self.scheduler = scheduler
+            pending, self._pending = self._pending, None
+            for changes in pending:
+                self.on_tasks_changed(changes)
 
     def check_alarms(self):
-        tasks = get_tasks_with_alarms()
-        now = datetime.now().isoformat()
-        for task in tasks:
-            if task.alarm_time and task.alarm_time <= now and not task.completed:
-                self.alarm_triggered.emit(task.id, task.text)
-                remove_alarm(task.id)
\ No newline at end of file
+        now = time.time()
+        with self._cond:
+            fired = self.scheduler.pop_due(now)
+        if not fired:
+            return
+        # один сигнал и одна транзакция на пачку: после сна или импорта
+        # срабатывают сразу тысячи. Запись — вне блокировки, чтобы не
+        # задерживать GUI-поток. Повторяющиеся будильники переносятся на
+        # следующее срабатывание и возвращаются в планировщик уведомлением
+        self.alarms_triggered.emit(fired)
+        try:
+            advance_alarms([task_id for task_id, _ in fired], now)
+        except Exception as e:
+            print(f"Ошибка при снятии будильников: {e}")
+
+    def on_tasks_changed(self, changes):
+        with self._cond:
+            if self._pending is not None:
+                self._pending.append(changes)
+            elif changes.reset:
+                self._reload = True
+            else:
+                self.scheduler.apply(changes)
+            self._cond.notify()
+
+    def quit(self):
+        remove_change_listener(self.on_tasks_changed)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
\ No newline at end of file
@@ -0,0 +1,92 @@
+# benchmarks/bench_connection.py
+# Сравнение: соединение на каждую операцию (как было) и постоянное соединение с WAL.
+# Запуск из корня проекта: python -m benchmarks.bench_connection [--ops N]
+import argparse
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import database
+from services import task_service
+
+
+def bench_legacy(db_path, ops):
+    # старое поведение: connect + execute + commit + close на каждую операцию
+    def add_task(text):
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO tasks (text, completed, priority, created_at, alarm_time) VALUES (?, ?, ?, ?, ?)",
+            (text, False, 'normal', datetime.now().isoformat(), None)
+        )
+        task_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return task_id
+
+    def update_priority(task_id, priority):
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE tasks SET priority = ? WHERE id = ?", (priority, task_id))
+        conn.commit()
+        conn.close()
+
+    return _run(add_task, update_priority, ops)
+
+
+def bench_pooled(db_path, ops):
+    database.DB_PATH = db_path
+    database.init_db()
+    return _run(task_service.add_task, task_service.update_task_priority, ops)
+
+
+def _run(add_task, update_priority, ops):
+    ids = []
+    start = time.perf_counter()
+    for i in range(ops):
+        ids.append(add_task(f"Задача {i}"))
+    insert_rate = ops / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i, task_id in enumerate(ids):
+        update_priority(task_id, ('low', 'normal', 'high')[i % 3])
+    update_rate = ops / (time.perf_counter() - start)
+    return insert_rate, update_rate
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ops', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = Path(tmp) / "legacy.db"
+        pooled_path = Path(tmp) / "pooled.db"
+
+        # схема для старого варианта — та же, но без WAL и прагм
+        conn = sqlite3.connect(legacy_path)
+        conn.execute('''
+            CREATE TABLE tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL,
+                completed BOOLEAN NOT NULL DEFAULT 0,
+                priority TEXT NOT NULL DEFAULT 'normal',
+                created_at TEXT NOT NULL,
+                alarm_time TEXT
+            )
+        ''')
+        conn.close()
+
+        legacy = bench_legacy(legacy_path, args.ops)
+        pooled = bench_pooled(pooled_path, args.ops)
+        database.close_connections()
+
+    print(f"{'':<22}{'до':>12}{'после':>12}{'x':>8}")
+    for name, before, after in (("add_task, оп/с", legacy[0], pooled[0]),
+                                ("update_priority, оп/с", legacy[1], pooled[1])):
+        print(f"{name:<22}{before:>12.0f}{after:>12.0f}{after / before:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
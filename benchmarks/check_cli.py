@@ -0,0 +1,94 @@
+# benchmarks/check_cli.py
+# Проверка командной строки (cli.py): каждая команда выполняется в отдельном
+# процессе, который не должен импортировать PyQt6 и plyer; холодный запуск
+# (медиана нескольких прогонов: типичный запуск, а не самый удачный) должен
+# укладываться в --budget-ms.
+# Запуск из корня проекта: python -m benchmarks.check_cli [--tasks N]
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import database
+from benchmarks.datasets import fill_db
+
+# модули, которых не должно быть в процессе cli
+FORBIDDEN = ('PyQt6', 'plyer')
+
+# команда -> аргументы; файлы импорта и экспорта — во временной папке
+COMMANDS = {
+    'add': ['add', 'Проверка командной строки', '--priority', 'high'],
+    'list': ['list', '--active', '--sort', 'date', '--limit', '1000'],
+    'list --search --json': ['list', '--search', 'молоко', '--json'],
+    'alarms': ['alarms', '--within', '60'],
+    'stats': ['stats', '--json'],
+    'export': ['export', '{tmp}/export.ndjson'],
+    'import': ['import', '{tmp}/export.ndjson'],
+}
+
+# запускается вместо python -m cli: после команды печатает загруженные
+# запрещённые модули (stderr, чтобы не смешивать с выводом команды)
+_PROBE = '''
+import sys, runpy
+sys.argv = ["cli"] + sys.argv[1:]
+try:
+    runpy.run_module("cli", run_name="__main__")
+except SystemExit:
+    pass
+print(",".join(sorted({m.split(".")[0] for m in sys.modules} & set(%r))), file=sys.stderr)
+''' % (FORBIDDEN,)
+
+
+def run_probe(db_path, args):
+    result = subprocess.run([sys.executable, '-c', _PROBE, '--db', str(db_path)] + args,
+                            capture_output=True, text=True, encoding='utf-8')
+    lines = result.stderr.strip().splitlines()
+    return result.returncode, (lines[-1] if lines else ''), result.stderr
+
+
+def cold_start_ms(command, runs):
+    # лучшее и медианное время процесса, мс
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + command, stdout=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=100)
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "cli.db"
+        database.DB_PATH = db_path
+        database.init_db()
+        fill_db(args.tasks)
+        database.close_connections()
+        for name, command in COMMANDS.items():
+            command = [part.format(tmp=tmp) for part in command]
+            code, loaded, stderr = run_probe(db_path, command)
+            ok = code == 0 and not loaded
+            failed = failed or not ok
+            detail = f"загружены {loaded}" if loaded else (stderr.strip() if code else "")
+            print(f"{'ok' if ok else 'FAIL':<5}{name}{': ' + detail if detail else ''}")
+        # настоящий python -m cli, как из cron; для сравнения — пустой интерпретатор
+        best, median = cold_start_ms(['-m', 'cli', '--db', str(db_path), 'stats'], args.runs)
+        bare, _ = cold_start_ms(['-c', 'pass'], args.runs)
+        ok = median <= args.budget_ms
+        failed = failed or not ok
+        print(f"{'ok' if ok else 'FAIL':<5}cold start (stats, {args.tasks} задач): медиана {median:.1f} мс "
+              f"(лучший {best:.1f}, python -c pass {bare:.1f}), бюджет {args.budget_ms:.0f} мс")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
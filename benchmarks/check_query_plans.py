@@ -0,0 +1,97 @@
+# benchmarks/check_query_plans.py
+# Проверка планов горячих запросов: завершается с ошибкой, если какой-то
+# запрос читает таблицу целиком без индекса или сортирует во временном B-дереве.
+# Запуск из корня проекта: python -m benchmarks.check_query_plans [--tasks N]
+import argparse
+import random
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+import database
+from services import archive_service, task_service
+
+# имя -> вызов сервиса, SQL которого проверяется
+HOT_QUERIES = {
+    'get_all_tasks': lambda: task_service.get_all_tasks(),
+    'get_tasks_filtered(active)': lambda: task_service.get_tasks_filtered(False),
+    'get_tasks_filtered(completed)': lambda: task_service.get_tasks_filtered(True),
+    'get_tasks_sorted(priority)': lambda: task_service.get_tasks_sorted('priority'),
+    'get_tasks_sorted(name)': lambda: task_service.get_tasks_sorted('name'),
+    'get_tasks_sorted(date)': lambda: task_service.get_tasks_sorted('date'),
+    'get_pending_alarms': lambda: task_service.get_pending_alarms(),
+    'get_overdue_alarms': lambda: task_service.get_overdue_alarms(),
+    'query_tasks(active, high, created)': lambda: task_service.query_tasks(task_service.TaskQuery(
+        completed=False, priorities=['high'], created_from=1704067200.0, created_to=1704153600.0,
+        limit=100)),
+    'query_tasks(completed, date desc)': lambda: task_service.query_tasks(task_service.TaskQuery(
+        completed=True, sort_by='date', descending=True, limit=100)),
+    'query_tasks(alarm range)': lambda: task_service.query_tasks(task_service.TaskQuery(
+        completed=False, alarm_from=1893492000.0, alarm_to=1893500000.0, sort_by=None)),
+    # срок больше возраста данных — ничего не переносится, проверяется только выборка
+    'archive_completed': lambda: archive_service.archive_completed(36500),
+}
+for _filter in (None, False):
+    for _sort in task_service.SORT_COLUMNS:
+        HOT_QUERIES[f'get_tasks_page({_filter}, {_sort})'] = (
+            lambda f=_filter, s=_sort: _next_page(f, s))
+
+
+def _next_page(completed_filter, sort_by):
+    # вторая страница: проверяются и первый запрос, и продолжение по курсору
+    first = task_service.get_tasks_page(completed_filter, sort_by, None, 50)
+    after = task_service.task_sort_key(sort_by)(first[-1])
+    return task_service.get_tasks_page(completed_filter, sort_by, after, 50)
+
+
+def fill(count):
+    rows = []
+    for i in range(count):
+        alarm = 1893492000.0 + i * 60 if random.random() < 0.05 else None  # 2030 год
+        rows.append((f"Задача {i}", int(random.random() < 0.7), random.randrange(3),
+                     1704067200.0 + i % 24 * 3600 + i / 1e6, alarm))
+    with database.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO tasks (text, completed, priority, created_at, alarm_time) VALUES (?, ?, ?, ?, ?)", rows)
+        conn.execute("ANALYZE")
+
+
+# полный просмотр таблицы без индекса: «SCAN t» для псевдонима, «SCAN TABLE tasks AS t»
+# в SQLite до 3.36; просмотр по индексу печатается с «USING ... INDEX» и не совпадает
+_FULL_SCAN = re.compile(r"^SCAN (TABLE )?\w+( AS \w+)?$")
+
+
+def bad_plan_steps(conn, sql):
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    bad = [step for step in plan if step.startswith("USE TEMP B-TREE") or _FULL_SCAN.match(step)]
+    return plan, bad
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=20000)
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = Path(tmp) / "plans.db"
+        database.init_db()
+        fill(args.tasks)
+        conn = database.get_connection()
+        for name, call in HOT_QUERIES.items():
+            statements = []
+            conn.set_trace_callback(statements.append)
+            call()
+            conn.set_trace_callback(None)
+            for sql in statements:
+                plan, bad = bad_plan_steps(conn, sql)
+                status = "FAIL" if bad else "ok"
+                failed = failed or bool(bad)
+                print(f"{status:<5}{name}: {'; '.join(plan)}")
+        database.close_connections()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
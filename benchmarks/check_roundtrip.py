@@ -0,0 +1,101 @@
+# benchmarks/check_roundtrip.py
+# Проверка круга «экспорт -> импорт»: после каждой правки из списка EDITS
+# задачи выгружаются во всех форматах и загружаются обратно в ту же базу —
+# импорт должен узнать каждую задачу по content_hash и ничего не добавить.
+# Запуск из корня проекта: python -m benchmarks.check_roundtrip
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import database
+from models import Recurrence
+from services import archive_service, task_service
+from services.export_service import FORMATS, export_tasks
+from services.import_service import import_tasks
+
+
+def _base():
+    # несколько задач: с будильником в будущем, завершённая, обычные
+    ids = [task_service.add_task(f"Задача {i}") for i in range(5)]
+    task_service.set_alarm(ids[1], time.time() + 3600)
+    task_service.set_completed([ids[2]])
+    return ids
+
+
+def _fire(ids, recurrence=None):
+    task_service.set_alarm(ids[0], time.time() - 60, recurrence)
+    task_service.advance_alarms([ids[0]])
+
+
+def _same_tick(text):
+    # две одинаковые задачи, добавленные в один и тот же момент
+    with mock.patch('time.time', return_value=time.time()):
+        return [task_service.add_task(text), task_service.add_task(text)]
+
+
+def _restore_over_twin(ids):
+    # хэш архивной задачи успевает перейти к её близнецу: правка текста туда и обратно
+    first, second = _same_tick("Близнец")
+    task_service.set_completed([first])
+    archive_service.archive_completed(older_than_days=0)
+    task_service.update_task_text(second, "Другой")
+    task_service.update_task_text(second, "Близнец")
+    archive_service.restore_tasks([first])
+
+
+# правка -> что она делает с задачами из _base()
+EDITS = {
+    'без правок': lambda ids: None,
+    'update_task_text': lambda ids: task_service.update_task_text(ids[0], "Новый текст"),
+    'update_tasks (текст и будильник)': lambda ids: task_service.update_tasks(
+        [(ids[0], 'text', "Из очереди"), (ids[3], 'alarm_time', time.time() + 60)]),
+    'set_alarm': lambda ids: task_service.set_alarm(ids[0], time.time() + 120),
+    'remove_alarm': lambda ids: task_service.remove_alarm(ids[1]),
+    'advance_alarms (одноразовый)': lambda ids: _fire(ids),
+    'advance_alarms (повторяющийся)': lambda ids: _fire(ids, Recurrence('day')),
+    'set_alarms (пакетно)': lambda ids: task_service.set_alarms(ids, time.time() + 600),
+    'clear_alarms (пакетно)': lambda ids: task_service.clear_alarms(ids),
+    'set_completed': lambda ids: task_service.set_completed(ids, False),
+    # две задачи получают одинаковое содержимое: хэш достаётся одной
+    'одинаковый текст': lambda ids: task_service.update_tasks(
+        [(ids[3], 'text', "Дубль"), (ids[4], 'text', "Дубль")]),
+    'add_task в один момент': lambda ids: _same_tick("Молоко"),
+    # архивная задача выгружается, но второй раз не добавляется
+    'archive_completed': lambda ids: archive_service.archive_completed(older_than_days=0),
+    'restore_tasks при занятом хэше': _restore_over_twin,
+}
+
+
+def check(tmp, name, edit) -> bool:
+    database.close_connections()
+    database.DB_PATH = Path(tmp) / f"roundtrip_{len(list(Path(tmp).iterdir()))}.db"
+    database.init_db()
+    edit(_base())
+    count = len(task_service.get_all_tasks())
+    problems = []
+    for fmt in FORMATS:
+        path = Path(tmp) / f"roundtrip.{fmt}"
+        exported = export_tasks(str(path), fmt=fmt)
+        if exported != count + archive_service.archived_count():
+            problems.append(f"{fmt}: выгружено {exported}")
+        result = import_tasks(str(path))
+        if result.inserted:
+            problems.append(f"{fmt}: добавлено {result.inserted}")
+    after = len(task_service.get_all_tasks())
+    if after != count:
+        problems.append(f"задач было {count}, стало {after}")
+    print(f"{'FAIL' if problems else 'ok':<5}{name}{': ' + '; '.join(problems) if problems else ''}")
+    return not problems
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [check(tmp, name, edit) for name, edit in EDITS.items()]
+        database.close_connections()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
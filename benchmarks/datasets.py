@@ -0,0 +1,74 @@
+# benchmarks/datasets.py
+# Генераторы синтетических задач для бенчмарков: доля завершённых, плотность
+# будильников и распределение приоритетов задаются параметрами, seed делает
+# набор воспроизводимым.
+import json
+import random
+import time
+
+from models import PRIORITY_NAMES, PRIORITY_RANKS, content_hash, to_iso
+
+import database
+
+WORDS = ("купить", "позвонить", "отчёт", "молоко", "встреча", "письмо", "проект",
+         "починить", "оплатить", "заказ", "врач", "билеты", "review", "deploy", "backup")
+PRIORITY_WEIGHTS = {'high': 0.2, 'normal': 0.5, 'low': 0.3}
+
+
+def generate_tasks(count, completed_ratio=0.5, alarm_density=0.05, overdue_ratio=0.5,
+                   priority_weights=None, seed=0, now=None):
+    # кортежи (text, completed, priority, created_at, alarm_time, content_hash)
+    # в порядке INSERT: приоритет — ранг, время — секунды epoch; хэш тот же, что
+    # у импорта. Будильники отсчитываются от now (по умолчанию — текущее время):
+    # с тем же now write_json того же набора — сплошь дубликаты
+    rng = random.Random(seed)
+    weights = priority_weights or PRIORITY_WEIGHTS
+    priorities, cum_weights = [PRIORITY_RANKS[name] for name in weights], []
+    total = 0.0
+    for name in weights:
+        total += weights[name]
+        cum_weights.append(total)
+    start = 1704067200.0  # 2024-01-01
+    now = time.time() if now is None else now
+    for i in range(count):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))) + f" #{i}"
+        completed = int(rng.random() < completed_ratio)
+        priority = rng.choices(priorities, cum_weights=cum_weights)[0]
+        created = start + i * 37
+        alarm = None
+        if rng.random() < alarm_density:
+            shift = rng.randint(1, 60 * 24 * 30) * 60
+            alarm = now - shift if rng.random() < overdue_ratio else now + shift
+        yield text, completed, priority, created, alarm, content_hash(text, created, alarm)
+
+
+def fill_db(count, batch_size=10000, **options):
+    # пишет задачи в текущую database.DB_PATH пачками, как импорт
+    batch = []
+    with database.transaction() as conn, database.text_search_deferred(conn), database.changes_deferred(conn):
+        for row in generate_tasks(count, **options):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.executemany(
+                    "INSERT INTO tasks (text, completed, priority, created_at, alarm_time, content_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    batch)
+                batch = []
+        if batch:
+            conn.executemany(
+                "INSERT INTO tasks (text, completed, priority, created_at, alarm_time, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                batch)
+    database.get_connection().execute("ANALYZE")
+
+
+def write_json(path, count, **options):
+    # файл в формате импорта: JSON-массив объектов с ISO-датами
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for i, (text, completed, priority, created, alarm, _) in enumerate(generate_tasks(count, **options)):
+            if i:
+                f.write(',\n')
+            json.dump({'text': text, 'completed': bool(completed), 'priority': PRIORITY_NAMES[priority],
+                       'created_at': to_iso(created), 'alarm_time': to_iso(alarm)}, f, ensure_ascii=False)
+        f.write(']')
\ No newline at end of file
@@ -0,0 +1,31 @@
+# benchmarks/startup.py
+# Холодный запуск приложения в отдельном процессе: этапы от импорта main.py
+# до готовности списка (instrumentation.startup_marks), в мс, печатаются JSON.
+# Запуск из корня проекта: python -m benchmarks.startup [путь к базе]
+import instrumentation  # первым, как в main.py: от него идёт отсчёт
+import json
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+def main():
+    import database
+    if len(sys.argv) > 1:
+        database.DB_PATH = Path(sys.argv[1])
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+    import main as app_main
+
+    app = QApplication(sys.argv[:1])
+    window = app_main.AppWithTray()
+    window.interactive.connect(lambda: QTimer.singleShot(0, window.quit_app))
+    window.show()
+    app.exec()
+    print(json.dumps(instrumentation.startup_marks()))
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,357 @@
+# benchmarks/suite.py
+# Набор бенчмарков сервисного слоя, импорта и экспорта, будильников и списка задач
+# на синтетических данных разного размера. Результаты пишутся в JSON;
+# с --compare сравниваются с сохранённым базовым прогоном, и при замедлении
+# больше порога процесс завершается с кодом 1.
+# Запуск из корня проекта:
+#   python -m benchmarks.suite --sizes 10000,100000 --output bench.json
+#   python -m benchmarks.suite --sizes 10000 --compare bench.json
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import database
+from benchmarks.datasets import fill_db, write_json
+from models import Recurrence
+from services import task_service
+from services.alarm_scheduler import AlarmScheduler
+from services.export_service import FORMATS, export_tasks
+from services.import_service import import_from_json
+
+GROUPS = ('service', 'import', 'alarms', 'ui', 'startup')
+
+
+def measure(call, repeat):
+    # время каждого вызова в миллисекундах и сводка по ним
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
+
+
+def summarize(timings, items=None):
+    timings = sorted(timings)
+    median = statistics.median(timings)
+    result = {
+        'runs': len(timings),
+        'min_ms': round(timings[0], 4),
+        'median_ms': round(median, 4),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        'mean_ms': round(statistics.fmean(timings), 4),
+        'ops_per_s': round(1000 / median, 1) if median else None,
+    }
+    if items is not None:
+        # для пакетных операций (импорт) важнее пропускная способность по задачам
+        result['items_per_s'] = round(items * 1000 / median, 1) if median else None
+    return result
+
+
+def bench_service(size, ops, repeat, options):
+    results = {}
+    fill_db(size, **options)
+    active = [task.id for task in task_service.get_tasks_filtered(False)[:ops]]
+    priorities = ('low', 'normal', 'high')
+
+    def per_op(name, call, args):
+        # каждая итерация — одна операция над своей задачей
+        timings = []
+        for arg in args:
+            start = time.perf_counter()
+            call(*arg)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = summarize(timings)
+
+    per_op('add_task', task_service.add_task, [(f"Новая задача {i}",) for i in range(ops)])
+    per_op('toggle_completed', task_service.toggle_completed, [(task_id, True) for task_id in active])
+    per_op('toggle_completed(back)', task_service.toggle_completed, [(task_id, False) for task_id in active])
+    per_op('update_task_text', task_service.update_task_text,
+           [(task_id, f"Изменённая задача {task_id}") for task_id in active])
+    per_op('update_task_priority', task_service.update_task_priority,
+           [(task_id, priorities[task_id % 3]) for task_id in active])
+    per_op('set_alarm', task_service.set_alarm,
+           [(task_id, f"2030-01-{task_id % 28 + 1:02d}T10:00:00") for task_id in active])
+    per_op('remove_alarm', task_service.remove_alarm, [(task_id,) for task_id in active])
+    # те же правки пакетом: одна транзакция на все ops задач
+    bulk = {
+        'set_completed(bulk)': lambda: task_service.set_completed(active, True),
+        'set_completed(bulk, back)': lambda: task_service.set_completed(active, False),
+        'set_priority(bulk)': lambda: task_service.set_priority(active, 'high'),
+        'set_alarms(bulk)': lambda: task_service.set_alarms(active, "2030-01-01T10:00:00"),
+        # прошедший повторяющийся будильник: срабатывание переносит его на завтра
+        'set_alarms(bulk, repeat)': lambda: task_service.set_alarms(active, time.time() - 60, Recurrence('day')),
+        'advance_alarms(bulk)': lambda: task_service.advance_alarms(active),
+        'clear_alarms(bulk)': lambda: task_service.clear_alarms(active),
+    }
+    for name, call in bulk.items():
+        results[name] = measure(call, 1)
+
+    queries = {
+        'get_all_tasks': lambda: task_service.get_all_tasks(),
+        'get_tasks_filtered(active)': lambda: task_service.get_tasks_filtered(False),
+        'get_tasks_filtered(completed)': lambda: task_service.get_tasks_filtered(True),
+        'get_tasks_sorted(priority)': lambda: task_service.get_tasks_sorted('priority'),
+        'get_tasks_sorted(name)': lambda: task_service.get_tasks_sorted('name'),
+        'get_tasks_sorted(date)': lambda: task_service.get_tasks_sorted('date'),
+        'get_tasks_with_alarms': lambda: task_service.get_tasks_with_alarms(),
+        'get_pending_alarms': lambda: task_service.get_pending_alarms(),
+        'get_overdue_alarms': lambda: task_service.get_overdue_alarms(),
+        'search_tasks(купить)': lambda: task_service.search_tasks("купить", limit=500),
+        'search_tasks(мол)': lambda: task_service.search_tasks("мол", False, 'date', 500),
+    }
+    for sort_by in task_service.SORT_COLUMNS:
+        queries[f'get_tasks_page({sort_by})'] = (
+            lambda s=sort_by: task_service.get_tasks_page(None, s, None, 100))
+        middle = task_service.get_tasks_page(None, sort_by, None, size // 2 or 1)
+        if middle:
+            after = task_service.task_sort_key(sort_by)(middle[-1])
+            queries[f'get_tasks_page({sort_by}, middle)'] = (
+                lambda s=sort_by, a=after: task_service.get_tasks_page(None, s, a, 100))
+    for name, call in queries.items():
+        results[name] = measure(call, repeat)
+
+    per_op('delete_task', task_service.delete_task,
+           [(task_id,) for task_id in active[:max(1, ops // 2)]])
+    results['clear_completed'] = measure(task_service.clear_completed, 1)
+    return results
+
+
+def bench_import(size, repeat, options, tmp):
+    path = Path(tmp) / f"import_{size}.json"
+    now = time.time()  # одно и то же для файла и fill_db ниже: будильники совпадут
+    write_json(path, size, now=now, **options)
+    timings = []
+    for run in range(repeat):
+        database.close_connections()
+        database.DB_PATH = Path(tmp) / f"import_{size}_{run}.db"
+        database.init_db()
+        start = time.perf_counter()
+        import_from_json(str(path))
+        timings.append((time.perf_counter() - start) * 1000)
+    results = {'import_from_json': summarize(timings, items=size)}
+    # повторный импорт того же файла: все задачи — дубликаты по content_hash
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        import_from_json(str(path))
+        timings.append((time.perf_counter() - start) * 1000)
+    results['reimport_from_json'] = summarize(timings, items=size)
+    # экспорт из последней импортированной базы
+    for fmt in FORMATS:
+        out = Path(tmp) / f"export_{size}.{fmt}"
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            export_tasks(str(out), fmt=fmt)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[f'export_tasks({fmt})'] = summarize(timings, items=size)
+    # тот же файл в базу, заполненную fill_db тем же набором: ON CONFLICT на каждой строке
+    database.close_connections()
+    database.DB_PATH = Path(tmp) / f"import_{size}_filled.db"
+    database.init_db()
+    fill_db(size, now=now, **options)
+    start = time.perf_counter()
+    skipped = import_from_json(str(path)).skipped
+    results['import_from_json(filled)'] = summarize([(time.perf_counter() - start) * 1000], items=size)
+    results['import_from_json(filled)']['skipped'] = skipped
+    return results
+
+
+def bench_alarms(size, repeat, options):
+    fill_db(size, **options)
+    results = {}
+    scheduler = AlarmScheduler()
+    results['alarm_load'] = measure(lambda: scheduler.load(task_service.get_pending_alarms()), repeat)
+
+    # то же, что AlarmManager.check_alarms: снять наступившие и одной
+    # транзакцией перенести повторяющиеся и погасить остальные в базе
+    scheduler.load(task_service.get_pending_alarms())
+    start = time.perf_counter()
+    now = time.time()
+    fired = scheduler.pop_due(now)
+    if fired:
+        task_service.advance_alarms([task_id for task_id, _ in fired], now)
+    elapsed = (time.perf_counter() - start) * 1000
+    results['alarm_check'] = summarize([elapsed], items=len(fired))
+    results['alarm_check']['fired'] = len(fired)
+    results['alarm_next_deadline'] = measure(scheduler.next_deadline, repeat)
+    return results
+
+
+def bench_ui(size, repeat, options):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication
+    from ui.main_window import TaskListView
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    fill_db(size, **options)
+    results = {}
+
+    start = time.perf_counter()
+    view = TaskListView()
+    view.resize(800, 600)
+    view.show()
+    view.start()
+    while view.loading:
+        app.processEvents()
+    results['list_startup'] = summarize([(time.perf_counter() - start) * 1000])
+
+    deadline = time.monotonic() + 600
+    while not view.repository.loaded and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+
+    def refresh(completed_filter, sort_by):
+        view.current_filter, view.current_sort = completed_filter, sort_by
+        view.refresh_tasks()
+        while view.loading:  # запрос выполняется в QueryRunner
+            app.processEvents()
+        app.processEvents()
+
+    for completed_filter, label in ((None, 'all'), (False, 'active'), (True, 'completed')):
+        for sort_by in ('priority', 'name', 'date'):
+            results[f'refresh_tasks({label}, {sort_by})'] = measure(
+                lambda f=completed_filter, s=sort_by: refresh(f, s), repeat)
+    refresh(None, 'priority')
+    results['render'] = measure(view.task_list.viewport().grab, repeat)
+
+    def scroll_to_end():
+        view.task_list.scrollToBottom()
+        app.processEvents()
+    results['scroll_page'] = measure(scroll_to_end, repeat)
+
+    view.shutdown()
+    view.close()
+    view.deleteLater()
+    app.processEvents()
+    return results
+
+
+def bench_startup(size, repeat, options):
+    # каждый запуск — новый процесс: в замер входят импорты PyQt6 и модулей
+    fill_db(size, **dict(options, alarm_density=0))  # без окна о просроченных задачах
+    database.close_connections()
+    marks = {}
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.startup', str(database.DB_PATH)],
+            capture_output=True, text=True, check=True,
+            env=dict(os.environ, QT_QPA_PLATFORM='offscreen')).stdout
+        for name, ms in json.loads(output.strip().splitlines()[-1]).items():
+            marks.setdefault(name, []).append(ms)
+    return {f'startup_{name}': summarize(timings) for name, timings in marks.items()}
+
+
+def run(sizes, groups, ops, repeat, options):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            for group in groups:
+                database.close_connections()
+                database.DB_PATH = Path(tmp) / f"{group}_{size}.db"
+                database.init_db()
+                print(f"{group} @ {size}...", file=sys.stderr)
+                try:
+                    if group == 'service':
+                        group_results = bench_service(size, ops, repeat, options)
+                    elif group == 'import':
+                        group_results = bench_import(size, max(1, repeat // 3), options, tmp)
+                    elif group == 'alarms':
+                        group_results = bench_alarms(size, repeat, options)
+                    elif group == 'startup':
+                        group_results = bench_startup(size, max(1, repeat // 3), options)
+                    else:
+                        group_results = bench_ui(size, repeat, options)
+                except ImportError as e:
+                    print(f"{group} пропущен: {e}", file=sys.stderr)
+                    continue
+                for name, result in group_results.items():
+                    results[f"{group}/{name}@{size}"] = result
+        database.close_connections()
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    # регрессия — медиана выросла больше чем в (1 + threshold) раз и при этом
+    # больше чем на min_delta_ms: у операций в доли миллисекунды шум велик
+    regressions = []
+    print(f"{'бенчмарк':<58}{'база, мс':>12}{'сейчас, мс':>12}{'x':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<58}{'—':>12}{result['median_ms']:>12.3f}{'new':>8}")
+            continue
+        ratio = result['median_ms'] / base['median_ms'] if base['median_ms'] else 1.0
+        regressed = ratio > 1 + threshold and result['median_ms'] - base['median_ms'] > min_delta_ms
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<58}{base['median_ms']:>12.3f}{result['median_ms']:>12.3f}{ratio:>8.2f}"
+              + ("  РЕГРЕССИЯ" if regressed else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10000', help="размеры наборов через запятую, например 10000,100000,1000000")
+    parser.add_argument('--groups', default=','.join(GROUPS), help="группы через запятую: " + ', '.join(GROUPS))
+    parser.add_argument('--ops', type=int, default=200, help="операций записи каждого вида")
+    parser.add_argument('--repeat', type=int, default=9, help="повторов каждого запроса")
+    parser.add_argument('--completed-ratio', type=float, default=0.5)
+    parser.add_argument('--alarm-density', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="куда записать результаты (JSON)")
+    parser.add_argument('--compare', help="JSON базового прогона для сравнения")
+    parser.add_argument('--threshold', type=float, default=0.25, help="допустимое замедление медианы, доля")
+    parser.add_argument('--min-delta-ms', type=float, default=0.5, help="меньшее замедление регрессией не считается")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    groups = [group for group in args.groups.split(',') if group]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"неизвестные группы: {', '.join(sorted(unknown))}")
+    options = {'completed_ratio': args.completed_ratio, 'alarm_density': args.alarm_density, 'seed': args.seed}
+
+    results = run(sizes, groups, args.ops, args.repeat, options)
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'groups': groups,
+            'ops': args.ops,
+            'repeat': args.repeat,
+            'dataset': options,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"Регрессий: {len(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
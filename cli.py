@@ -0,0 +1,196 @@
+# cli.py
+# Командная строка без GUI: python -m cli <команда> [параметры].
+# Работает прямо с services/*; PyQt6 и plyer не импортируются (проверка —
+# benchmarks/check_cli.py), поэтому подходит для скриптов, cron и машин
+# без дисплея. Импорт и экспорт подгружаются только своими командами.
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import database
+from models import PRIORITY_NAMES, to_iso
+from services.task_service import SORT_COLUMNS, TaskQuery, add_task, iter_tasks, task_stats
+
+
+def _completed_filter(args):
+    if args.active:
+        return False
+    if args.completed:
+        return True
+    return None
+
+
+def _write_tasks(tasks, as_json: bool):
+    # по строке на задачу сразу в stdout: длинный список не копится в памяти
+    if as_json:
+        import json
+    out = sys.stdout
+    for task in tasks:
+        if as_json:
+            out.write(json.dumps({
+                'id': task.id, 'text': task.text, 'completed': bool(task.completed),
+                'priority': task.priority_name, 'created_at': to_iso(task.created_at),
+                'alarm_time': to_iso(task.alarm_time)}, ensure_ascii=False) + "\n")
+        else:
+            alarm = to_iso(task.alarm_time)[:16] if task.alarm_time is not None else ""
+            out.write(f"{task.id}\t[{'x' if task.completed else ' '}]\t{task.priority_name}\t{alarm}\t{task.text}\n")
+
+
+def cmd_add(args):
+    print(add_task(" ".join(args.text), args.alarm, args.priority))
+
+
+def cmd_list(args):
+    sort_by = args.sort or ('relevance' if args.search else 'priority')
+    _write_tasks(iter_tasks(TaskQuery(
+        completed=_completed_filter(args), priorities=args.priority, text=args.search,
+        sort_by=sort_by, descending=args.desc, limit=args.limit)), args.json)
+
+
+def cmd_alarms(args):
+    # прошедшие будильники незавершённых задач, с --within — и ближайшие
+    until = time.time() + args.within * 60
+    _write_tasks(iter_tasks(TaskQuery(completed=False, alarm_to=until, sort_by=None)), args.json)
+
+
+def cmd_import(args):
+    from services.import_service import import_tasks
+    result = import_tasks(args.file, mode='update' if args.update else 'skip')
+    print(f"Добавлено: {result.inserted} | Обновлено: {result.updated} | Пропущено: {result.skipped}")
+
+
+def cmd_export(args):
+    from services.export_service import export_tasks
+    count = export_tasks(args.file, _completed_filter(args), args.format, include_archive=not args.no_archive)
+    print(f"Экспортировано: {count}")
+
+
+def cmd_stats(args):
+    from services.archive_service import archived_count
+    stats = task_stats()
+    stats['archived'] = archived_count()
+    if args.json:
+        import json
+        print(json.dumps(stats))
+    else:
+        for name, value in stats.items():
+            print(f"{name}\t{value}")
+
+
+def _add_filter_arguments(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--active', action='store_true', help="только незавершённые")
+    group.add_argument('--completed', action='store_true', help="только завершённые")
+
+
+def _add_arguments(parser):
+    parser.add_argument('text', nargs='+')
+    parser.add_argument('--alarm', help="время будильника, ISO: 2030-01-31T09:00")
+    parser.add_argument('--priority', choices=PRIORITY_NAMES)
+
+
+def _list_arguments(parser):
+    _add_filter_arguments(parser)
+    parser.add_argument('--priority', choices=PRIORITY_NAMES, action='append', help="можно несколько раз")
+    parser.add_argument('--search', help="слова ищутся как префиксы")
+    parser.add_argument('--sort', choices=list(SORT_COLUMNS) + ['relevance'])
+    parser.add_argument('--desc', action='store_true', help="в обратном порядке")
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--json', action='store_true', help="по JSON-объекту на строку")
+
+
+def _alarms_arguments(parser):
+    parser.add_argument('--within', type=float, default=0, help="и с будильником в ближайшие N минут")
+    parser.add_argument('--json', action='store_true', help="по JSON-объекту на строку")
+
+
+def _import_arguments(parser):
+    parser.add_argument('file')
+    parser.add_argument('--update', action='store_true', help="обновлять уже добавленные задачи")
+
+
+def _export_arguments(parser):
+    parser.add_argument('file')
+    _add_filter_arguments(parser)
+    parser.add_argument('--format', choices=('json', 'ndjson', 'csv'))
+    parser.add_argument('--no-archive', action='store_true', help="без задач из архива")
+
+
+def _stats_arguments(parser):
+    parser.add_argument('--json', action='store_true')
+
+
+# команда -> (обработчик, аргументы, справка)
+COMMANDS = {
+    'add': (cmd_add, _add_arguments, "добавить задачу, печатает её id"),
+    'list': (cmd_list, _list_arguments, "список задач: id, [x], приоритет, будильник, текст"),
+    'alarms': (cmd_alarms, _alarms_arguments, "задачи с наступившим будильником"),
+    'import': (cmd_import, _import_arguments, "импорт из JSON, NDJSON или CSV"),
+    'export': (cmd_export, _export_arguments, "экспорт; формат по расширению файла"),
+    'stats': (cmd_stats, _stats_arguments, "сводка по задачам"),
+}
+
+
+def _formatter(prog):
+    # ширина справки без shutil: HelpFormatter по умолчанию импортирует его
+    # ради ширины терминала, а это заметная часть холодного запуска
+    try:
+        width = os.get_terminal_size().columns - 2
+    except OSError:
+        width = 78
+    return argparse.HelpFormatter(prog, width=width)
+
+
+def _command_name(argv):
+    # первое позиционное слово — команда; значение --db пропускается
+    args = iter(argv)
+    for arg in args:
+        if arg == '--db':
+            next(args, None)
+        elif not arg.startswith('-'):
+            return arg
+    return None
+
+
+def build_parser(command: str = None) -> argparse.ArgumentParser:
+    # аргументы добавляются только выбранной команде: при запуске из cron не
+    # строятся парсеры остальных. Без команды или с неизвестной — всем, ради
+    # справки и сообщения об ошибке
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Задачи ToDo App без графического интерфейса",
+                                     formatter_class=_formatter)
+    parser.add_argument('--db', type=Path, help="файл базы (по умолчанию tasks.db в текущей папке)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, (handler, add_arguments, help_text) in COMMANDS.items():
+        subparser = commands.add_parser(name, help=help_text, formatter_class=_formatter)
+        if command == name or command not in COMMANDS:
+            add_arguments(subparser)
+        subparser.set_defaults(handler=handler)
+    return parser
+
+
+def main(argv=None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    args = build_parser(_command_name(argv)).parse_args(argv)
+    if args.db is not None:
+        database.DB_PATH = args.db
+    try:
+        database.init_db()
+        args.handler(args)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # читатель закрыл вывод раньше (| head) — это не ошибка
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    finally:
+        database.close_connections()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -1,14 +1,173 @@
 # database.py
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+import instrumentation
+from models import content_hash
 
 DB_PATH = Path("tasks.db")
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
+# размер кэша подготовленных выражений на каждое соединение
+CACHED_STATEMENTS = 256
+
+# настройки, применяемые к каждому новому соединению
+CONNECTION_PRAGMAS = (
+    # новая база создаётся с постраничным освобождением места (см. maintain());
+    # у существующей режим меняется только после VACUUM. Должна идти до
+    # journal_mode: переключение в WAL уже записывает заголовок файла
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",  # в режиме WAL fsync только на checkpoint
+    "PRAGMA cache_size = -16384",  # ~16 МБ страничного кэша
+    "PRAGMA mmap_size = 268435456",  # 256 МБ
+    "PRAGMA temp_store = MEMORY",
+)
+
+# maintain(): страниц за один шаг incremental_vacuum — запись блокируется ненадолго
+VACUUM_STEP_PAGES = 2048
+# maintain(): база без auto_vacuum пересобирается VACUUM, если свободно больше этой доли страниц
+VACUUM_FREE_RATIO = 0.25
+# maintain(): сколько последних записей журнала task_changes хранить;
+# процесс, отставший сильнее, просто перечитывает задачи целиком
+CHANGE_LOG_KEEP = 10000
+
+_local = threading.local()
+_connections = []  # все открытые соединения, чтобы закрыть их при выходе
+_connections_lock = threading.Lock()
+_generation = 0  # меняется в close_connections(), чтобы потоки переоткрыли соединения
+# версии журнала task_changes, записанные транзакциями этого процесса:
+# диапазоны (после версии, до версии включительно). None — не отслеживаются
+_local_changes = None
+_local_changes_lock = threading.Lock()
+
+
+def _connect():
+    # isolation_level=None: транзакциями управляем сами через transaction()
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=10,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=CACHED_STATEMENTS,
+        factory=instrumentation.connection_factory(),
+    )
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    with _connections_lock:
+        _connections.append(conn)
+    return conn
+
+
+def get_connection():
+    # одно долгоживущее соединение на поток; переоткрываем, если сменился DB_PATH
+    conn = getattr(_local, 'conn', None)
+    key = (DB_PATH, _generation)
+    if conn is None or _local.key != key:
+        if conn is not None:
+            _close(conn)
+        conn = _connect()
+        _local.conn = conn
+        _local.key = key
+    return conn
+
+
+@contextmanager
+def transaction():
+    conn = get_connection()
+    if conn.in_transaction:
+        # вложенный вызов — работаем в рамках внешней транзакции
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    # под блокировкой записи все новые версии журнала — от этой транзакции
+    first = change_version(conn) if _local_changes is not None else None
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        # отмечаем до COMMIT, чтобы ChangeFeed не успел принять их за чужие
+        span = _note_local_changes(first, change_version(conn)) if first is not None else None
+        try:
+            conn.execute("COMMIT")
+        except BaseException:
+            _forget_local_changes(span)
+            raise
+
+
+def change_version(conn) -> int:
+    # последняя выданная версия журнала task_changes (0 — записей ещё не было)
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'task_changes'").fetchone()
+    return row[0] if row else 0
+
+
+def track_local_changes(enabled: bool):
+    # включает ChangeFeed: без него диапазоны не копятся
+    global _local_changes
+    with _local_changes_lock:
+        _local_changes = [] if enabled else None
+
+
+def _note_local_changes(first: int, last: int):
+    if last <= first:
+        return None
+    span = (first, last)
+    with _local_changes_lock:
+        if _local_changes is None:
+            return None
+        _local_changes.append(span)
+    return span
+
+
+def _forget_local_changes(span):
+    with _local_changes_lock:
+        if span is not None and _local_changes is not None and span in _local_changes:
+            _local_changes.remove(span)
+
+
+def take_local_changes(until: int):
+    # диапазоны версий этого процесса, закончившиеся не позже until, по возрастанию;
+    # более поздние остаются до следующего вызова
+    with _local_changes_lock:
+        if not _local_changes:
+            return []
+        taken = [span for span in _local_changes if span[1] <= until]
+        _local_changes[:] = [span for span in _local_changes if span[1] > until]
+    return taken
+
+
+def _close(conn):
+    with _connections_lock:
+        if conn in _connections:
+            _connections.remove(conn)
+    conn.close()
+
+
+def close_connections():
+    global _generation
+    with _connections_lock:
+        _generation += 1
+        connections = list(_connections)
+        _connections.clear()
+    for conn in connections:
+        try:
+            # обновляет статистику планировщика, если она устарела
+            conn.execute("PRAGMA optimize")
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+# ранг строкового приоритета: до миграции 4 по нему был построен индекс
+# idx_tasks_priority, сейчас приоритет хранится рангом (models.PRIORITY_NAMES)
+PRIORITY_RANK_SQL = "CASE priority WHEN 'high' THEN 0 WHEN 'normal' THEN 1 ELSE 2 END"
+
+
+def _create_tasks_table(conn):
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS tasks (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             text TEXT NOT NULL,
@@ -18,13 +177,338 @@ def init_db():
             alarm_time TEXT
         )
     ''')
-    # проверим, есть ли колонка alarm_time
-    cursor.execute("PRAGMA table_info(tasks)")
-    columns = [row[1] for row in cursor.fetchall()]
+    # базы старых версий могли быть созданы без колонки alarm_time
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(tasks)")]
     if 'alarm_time' not in columns:
-        cursor.execute("ALTER TABLE tasks ADD COLUMN alarm_time TEXT")
-    conn.commit()
-    conn.close()
+        conn.execute("ALTER TABLE tasks ADD COLUMN alarm_time TEXT")
 
-def get_connection():
-    return sqlite3.connect(DB_PATH)
\ No newline at end of file
+
+def _add_list_indexes(conn):
+    # по индексу на каждый порядок списка, чтобы ORDER BY шёл без сортировки
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(completed, {PRIORITY_RANK_SQL}, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_name ON tasks(completed, text COLLATE NOCASE, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_date ON tasks(completed, created_at)")
+    # будильники нужны только у незавершённых задач
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_alarm ON tasks(alarm_time) WHERE completed = 0 AND alarm_time IS NOT NULL")
+    conn.execute("ANALYZE")
+
+
+def _add_text_search(conn):
+    # FTS5 есть не во всех сборках SQLite; без неё поиск работает через LIKE
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+                text, content='tasks', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return
+    # внешний контент: индекс синхронизируется с tasks триггерами.
+    # Пока в tasks_fts_paused есть строка, триггер вставки молчит — см. text_search_deferred()
+    conn.execute("CREATE TABLE IF NOT EXISTS tasks_fts_paused (paused INTEGER)")
+    _create_text_search_triggers(conn)
+    conn.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+
+def _create_text_search_triggers(conn):
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks
+        WHEN NOT EXISTS (SELECT 1 FROM tasks_fts_paused) BEGIN
+            INSERT INTO tasks_fts(rowid, text) VALUES (new.id, new.text);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF text ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO tasks_fts(rowid, text) VALUES (new.id, new.text);
+        END
+    ''')
+
+
+def _iso_to_epoch(value):
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _encode_priority_and_times(conn):
+    # priority -> ранг (0 — high, 1 — normal, 2 — low), created_at и alarm_time ->
+    # секунды epoch: сравнение чисел вместо CASE и строк, меньше памяти на задачу.
+    # Тип колонки в SQLite не меняется, поэтому таблица пересоздаётся.
+    conn.create_function("iso_to_epoch", 1, _iso_to_epoch)
+    sequence = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'tasks'").fetchone()[0]
+    conn.execute('''
+        CREATE TABLE tasks_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            priority INTEGER NOT NULL DEFAULT 1,
+            created_at REAL NOT NULL,
+            alarm_time REAL
+        )
+    ''')
+    conn.execute(f'''
+        INSERT INTO tasks_new (id, text, completed, priority, created_at, alarm_time)
+        SELECT id, text, completed != 0, {PRIORITY_RANK_SQL},
+               COALESCE(iso_to_epoch(created_at), CAST(strftime('%s', 'now') AS REAL)),
+               iso_to_epoch(alarm_time)
+        FROM tasks
+    ''')
+    # индексы и триггеры удаляются вместе со старой таблицей
+    conn.execute("DROP TABLE tasks")
+    conn.execute("ALTER TABLE tasks_new RENAME TO tasks")
+    # AUTOINCREMENT не должен выдавать id удалённых задач повторно
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'tasks'")
+    conn.execute("INSERT INTO sqlite_sequence (name, seq) SELECT 'tasks', MAX(?, COALESCE(MAX(id), 0)) FROM tasks",
+                 (sequence,))
+
+    conn.execute("CREATE INDEX idx_tasks_priority ON tasks(completed, priority, created_at)")
+    conn.execute("CREATE INDEX idx_tasks_name ON tasks(completed, text COLLATE NOCASE, created_at)")
+    conn.execute("CREATE INDEX idx_tasks_date ON tasks(completed, created_at)")
+    conn.execute("CREATE INDEX idx_tasks_alarm ON tasks(alarm_time) WHERE completed = 0 AND alarm_time IS NOT NULL")
+    fts = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'").fetchone()
+    if fts is not None:
+        # rowid и текст не изменились — сам индекс FTS перестраивать не нужно
+        _create_text_search_triggers(conn)
+
+    # прежнее строковое представление — для внешних инструментов и выгрузок
+    conn.execute('''
+        CREATE VIEW tasks_iso AS
+        SELECT id, text, completed,
+               CASE priority WHEN 0 THEN 'high' WHEN 1 THEN 'normal' ELSE 'low' END AS priority,
+               strftime('%Y-%m-%dT%H:%M:%f', created_at, 'unixepoch', 'localtime') AS created_at,
+               strftime('%Y-%m-%dT%H:%M:%f', alarm_time, 'unixepoch', 'localtime') AS alarm_time
+        FROM tasks
+    ''')
+    conn.execute("ANALYZE")
+
+
+def _add_archive(conn):
+    # Завершённые задачи старше заданного срока переносятся в tasks_archive
+    # (services/archive_service.py), чтобы tasks и её индексы росли с числом
+    # открытых задач, а не со всей историей. Срок отсчитывается от completed_at;
+    # у задач, завершённых до этой миграции, времени завершения нет — берётся created_at.
+    conn.execute("ALTER TABLE tasks ADD COLUMN completed_at REAL")
+    conn.execute("UPDATE tasks SET completed_at = created_at WHERE completed = 1")
+    conn.execute("CREATE INDEX idx_tasks_completed_at ON tasks(completed_at) WHERE completed = 1")
+    conn.execute('''
+        CREATE TRIGGER tasks_completed_insert AFTER INSERT ON tasks
+        WHEN new.completed AND new.completed_at IS NULL BEGIN
+            UPDATE tasks SET completed_at = new.created_at WHERE id = new.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER tasks_completed_update AFTER UPDATE OF completed ON tasks
+        WHEN new.completed IS NOT old.completed BEGIN
+            UPDATE tasks SET completed_at = CASE WHEN new.completed
+                THEN (julianday('now') - 2440587.5) * 86400.0 END
+            WHERE id = new.id;
+        END
+    ''')
+
+    # id сохраняется: AUTOINCREMENT не выдаёт его повторно, поэтому
+    # восстановленная задача возвращается в tasks под прежним id
+    conn.execute('''
+        CREATE TABLE tasks_archive (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            alarm_time REAL,
+            completed_at REAL,
+            archived_at REAL NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX idx_archive_archived_at ON tasks_archive(archived_at)")
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'").fetchone():
+        # поиск по архиву — отдельный индекс FTS5 с теми же настройками
+        conn.execute('''
+            CREATE VIRTUAL TABLE tasks_archive_fts USING fts5(
+                text, content='tasks_archive', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        ''')
+        conn.execute('''
+            CREATE TRIGGER tasks_archive_fts_insert AFTER INSERT ON tasks_archive BEGIN
+                INSERT INTO tasks_archive_fts(rowid, text) VALUES (new.id, new.text);
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER tasks_archive_fts_delete AFTER DELETE ON tasks_archive BEGIN
+                INSERT INTO tasks_archive_fts(tasks_archive_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            END
+        ''')
+
+
+def _add_content_hash(conn):
+    # Хэш содержимого задачи (models.content_hash) под уникальным индексом:
+    # импорт пропускает или обновляет уже добавленные задачи через ON CONFLICT.
+    # В архиве индекс не уникальный — импорт проверяет его отдельно.
+    # Дубликаты, которые уже есть в tasks, хэш не получают (кроме первого):
+    # удалять задачи миграция не должна.
+    conn.create_function("task_content_hash", 3, content_hash)
+    for table in ("tasks", "tasks_archive"):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN content_hash INTEGER")
+        conn.execute(f"UPDATE {table} SET content_hash = task_content_hash(text, created_at, alarm_time)")
+    conn.execute('''
+        UPDATE tasks SET content_hash = NULL
+        WHERE id NOT IN (SELECT MIN(id) FROM tasks GROUP BY content_hash)
+    ''')
+    conn.execute("CREATE UNIQUE INDEX idx_tasks_content_hash ON tasks(content_hash)")
+    conn.execute("CREATE INDEX idx_archive_content_hash ON tasks_archive(content_hash)")
+
+
+def _add_change_log(conn):
+    # Журнал изменений для других процессов (services/change_feed.py): триггеры
+    # записывают id каждой добавленной, изменённой или удалённой задачи под
+    # возрастающей версией. task_id NULL — изменилось сразу многое (импорт),
+    # читателю проще перечитать всё. Пока в task_changes_paused есть строка,
+    # триггеры молчат — см. changes_deferred().
+    conn.execute('''
+        CREATE TABLE task_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER
+        )
+    ''')
+    conn.execute("CREATE TABLE task_changes_paused (paused INTEGER)")
+    conn.execute('''
+        CREATE TRIGGER task_changes_insert AFTER INSERT ON tasks
+        WHEN NOT EXISTS (SELECT 1 FROM task_changes_paused) BEGIN
+            INSERT INTO task_changes (task_id) VALUES (new.id);
+        END
+    ''')
+    # completed_at и content_hash не показываются — их изменение не пишется
+    conn.execute('''
+        CREATE TRIGGER task_changes_update AFTER UPDATE OF text, completed, priority, created_at, alarm_time ON tasks
+        WHEN NOT EXISTS (SELECT 1 FROM task_changes_paused) BEGIN
+            INSERT INTO task_changes (task_id) VALUES (new.id);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER task_changes_delete AFTER DELETE ON tasks
+        WHEN NOT EXISTS (SELECT 1 FROM task_changes_paused) BEGIN
+            INSERT INTO task_changes (task_id) VALUES (old.id);
+        END
+    ''')
+
+
+def _add_recurrence(conn):
+    # Правило повторения будильника (models.Recurrence). Серия не разворачивается
+    # в строки: alarm_time хранит только ближайшее срабатывание и остаётся под
+    # частичным индексом idx_tasks_alarm, после срабатывания
+    # task_service.advance_alarms переносит его на следующее. repeat_unit NULL —
+    # будильник одноразовый.
+    for column in ("repeat_unit TEXT", "repeat_every INTEGER", "repeat_until REAL", "repeat_count INTEGER"):
+        conn.execute(f"ALTER TABLE tasks ADD COLUMN {column}")
+
+
+def has_text_search() -> bool:
+    row = get_connection().execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'").fetchone()
+    return row is not None
+
+
+@contextmanager
+def text_search_deferred(conn):
+    # Для пакетной вставки внутри транзакции: FTS5, вызванный из триггера,
+    # сбрасывает индекс после каждой строки, поэтому новые строки
+    # индексируются одним запросом в конце. Другие процессы в это время
+    # писать не могут — транзакция держит блокировку записи.
+    if not conn.in_transaction or not has_text_search():
+        yield conn
+        return
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0]
+    conn.execute("INSERT INTO tasks_fts_paused (paused) VALUES (1)")
+    try:
+        yield conn
+        conn.execute("INSERT INTO tasks_fts(rowid, text) SELECT id, text FROM tasks WHERE id > ?", (last_id,))
+    finally:
+        conn.execute("DELETE FROM tasks_fts_paused")
+
+
+@contextmanager
+def changes_deferred(conn):
+    # Для пакетной записи внутри транзакции: вместо записи журнала на каждую
+    # задачу — одна запись «изменилось всё», и то только если что-то изменилось.
+    if not conn.in_transaction:
+        yield conn
+        return
+    conn.execute("INSERT INTO task_changes_paused (paused) VALUES (1)")
+    before = conn.total_changes
+    try:
+        yield conn
+        if conn.total_changes != before:
+            conn.execute("INSERT INTO task_changes (task_id) VALUES (NULL)")
+    finally:
+        conn.execute("DELETE FROM task_changes_paused")
+
+
+# Миграции применяются по порядку, каждая в своей транзакции; номер миграции
+# (позиция в списке + 1) записывается в PRAGMA user_version. Существующие
+# миграции не меняются — только добавляются новые в конец списка.
+MIGRATIONS = [
+    _create_tasks_table,
+    _add_list_indexes,
+    _add_text_search,
+    _encode_priority_and_times,
+    _add_archive,
+    _add_content_hash,
+    _add_change_log,
+    _add_recurrence,
+]
+
+
+def schema_version() -> int:
+    return get_connection().execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate():
+    for number, migration in enumerate(MIGRATIONS, start=1):
+        if schema_version() >= number:
+            continue
+        with transaction() as conn:
+            # версию перепроверяем под блокировкой записи: другой процесс мог успеть раньше
+            if schema_version() >= number:
+                continue
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+
+
+def init_db():
+    migrate()
+
+
+def maintain(analyze: bool = False):
+    # Периодическое обслуживание (фоновый поток, см. ui/workers.MaintenanceWorker):
+    # обрезка журнала изменений, возврат свободных страниц файлу и обновление
+    # статистики планировщика.
+    # analyze=True — после крупных изменений (архивации), иначе PRAGMA optimize
+    # сам решает, какие таблицы переанализировать.
+    conn = get_connection()
+    conn.execute("DELETE FROM task_changes WHERE version <= ?", (change_version(conn) - CHANGE_LOG_KEEP,))
+    auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if auto_vacuum == 2:
+        # по шагам, чтобы между ними успевали пройти записи других потоков
+        while free:
+            conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+            left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if left >= free:
+                break
+            free = left
+    elif free > conn.execute("PRAGMA page_count").fetchone()[0] * VACUUM_FREE_RATIO:
+        # однократно для старой базы: VACUUM заодно включает auto_vacuum из CONNECTION_PRAGMAS
+        conn.execute("VACUUM")
+    if analyze:
+        conn.execute("ANALYZE")
+    else:
+        conn.execute("PRAGMA optimize")
\ No newline at end of file
@@ -0,0 +1,327 @@
+# instrumentation.py
+# Необязательный сбор статистики: время вызовов сервисов, время и число строк
+# каждого SQL-выражения, фазы обновления списка и журнал медленных запросов
+# с планом EXPLAIN QUERY PLAN.
+#
+# Включается переменными окружения до запуска приложения:
+#   TODO_PROFILE=1                 — собирать статистику
+#   TODO_PROFILE=stats.json        — то же, и записать её в файл при выходе
+#   TODO_SLOW_QUERY_MS=50          — порог журнала медленных запросов, мс
+# Выключенный сбор ничего не стоит: timed() возвращает функцию как есть,
+# соединения открываются обычным sqlite3.Connection, phase() — пустой контекст.
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from functools import wraps
+
+# верхние границы корзин гистограммы, мс
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+SLOW_LOG_SIZE = 200
+
+enabled = False
+dump_path = None
+slow_query_ms = 50.0
+
+_lock = threading.Lock()
+_local = threading.local()
+_calls = {}
+_statements = {}
+_phases = {}
+_slow_queries = deque(maxlen=SLOW_LOG_SIZE)
+_started_at = None
+_NULL_PHASE = nullcontext()
+
+# отсчёт этапов запуска — от импорта этого модуля (main.py импортирует его первым)
+_process_start = time.perf_counter()
+_startup = {}
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.sql_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms: float, rows: int = 0, sql_ms: float = 0.0):
+        self.count += 1
+        self.total_ms += ms
+        self.rows += rows
+        self.sql_ms += sql_ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        # верхняя граница корзины, в которую попадает перцентиль
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max_ms
+
+    def to_dict(self, with_sql=False) -> dict:
+        result = {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 4) if self.count else 0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+            'histogram': {f"<={bound}": count for bound, count in zip(BUCKETS_MS, self.buckets) if count},
+        }
+        if self.buckets[-1]:
+            result['histogram'][f">{BUCKETS_MS[-1]}"] = self.buckets[-1]
+        if with_sql:
+            # время вне SQLite: разбор строк в Task, уведомления и прочий Python
+            result['sql_ms'] = round(self.sql_ms, 3)
+            result['python_ms'] = round(self.total_ms - self.sql_ms, 3)
+        return result
+
+
+def _record(table, key, ms, rows=0, sql_ms=0.0):
+    with _lock:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram()
+        histogram.add(ms, rows, sql_ms)
+
+
+def _sql_ms() -> float:
+    return getattr(_local, 'sql_ms', 0.0)
+
+
+def enable(slow_ms: float = None, path: str = None):
+    # должно быть вызвано до импорта сервисов и открытия соединений:
+    # обёртки timed() ставятся при импорте, фабрика соединений — при подключении
+    global enabled, slow_query_ms, dump_path, _started_at
+    enabled = True
+    if slow_ms is not None:
+        slow_query_ms = slow_ms
+    if path:
+        dump_path = path
+    _started_at = datetime.now().isoformat()
+
+
+def configure_from_env():
+    value = os.environ.get('TODO_PROFILE', '').strip()
+    if not value or value == '0':
+        return
+    slow = os.environ.get('TODO_SLOW_QUERY_MS')
+    enable(float(slow) if slow else None, None if value == '1' else value)
+
+
+def timed(func=None, *, name=None):
+    # декоратор для точек входа сервисов; при выключенном сборе — без обёртки
+    if func is None:
+        return lambda f: timed(f, name=name)
+    if not enabled:
+        return func
+    key = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        sql_before = _sql_ms()
+        start = time.perf_counter()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            rows = len(result) if isinstance(result, list) else 0
+            _record(_calls, key, ms, rows, _sql_ms() - sql_before)
+    return wrapper
+
+
+@contextmanager
+def _timed_phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(_phases, name, (time.perf_counter() - start) * 1000)
+
+
+def phase(name: str):
+    # with phase('refresh_tasks.query'): ... — время участка кода
+    return _timed_phase(name) if enabled else _NULL_PHASE
+
+
+def mark_startup(name: str):
+    # этапы запуска пишутся всегда: это несколько чисел за всё время работы
+    _startup.setdefault(name, round((time.perf_counter() - _process_start) * 1000, 3))
+
+
+def startup_marks() -> dict:
+    return dict(_startup)
+
+
+class _Cursor(sqlite3.Cursor):
+    # Время выражения = execute + все чтения строк: SQLite выполняет запрос
+    # по мере выборки. Итог записывается, когда строки кончились, курсор
+    # переиспользован или удалён.
+    _sql = None
+
+    def _begin(self, sql, parameters, many):
+        self._sql = sql
+        self._parameters = parameters
+        self._many = many
+        self._ms = 0.0
+        self._rows = 0
+
+    def _add(self, start, rows=0):
+        ms = (time.perf_counter() - start) * 1000
+        _local.sql_ms = _sql_ms() + ms
+        if self._sql is not None:
+            self._ms += ms
+            self._rows += rows
+
+    def _finish(self):
+        sql, self._sql = self._sql, None
+        if sql is None:
+            return
+        key = " ".join(sql.split())
+        _record(_statements, key, self._ms, self._rows)
+        if self._ms >= slow_query_ms:
+            self._log_slow(key, sql)
+
+    def _log_slow(self, key, sql):
+        plan = None
+        if not self._many:
+            try:
+                plan = [row[3] for row in sqlite3.Connection.execute(
+                    self.connection, "EXPLAIN QUERY PLAN " + sql, self._parameters)]
+            except sqlite3.Error:
+                pass
+        entry = {'at': datetime.now().isoformat(), 'ms': round(self._ms, 3), 'rows': self._rows,
+                 'sql': key, 'plan': plan}
+        with _lock:
+            _slow_queries.append(entry)
+        print(f"Медленный запрос {entry['ms']} мс: {key}" + (f" | план: {'; '.join(plan)}" if plan else ""))
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._begin(sql, parameters, False)
+            self._add(start)
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._begin(sql, None, True)
+            self._add(start, max(self.rowcount, 0))
+            self._finish()
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add(start, row is not None)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._add(start, len(rows))
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add(start, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add(start)
+            self._finish()
+            raise
+        self._add(start, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class _Connection(sqlite3.Connection):
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    return _Connection if enabled else sqlite3.Connection
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            'started_at': _started_at,
+            'taken_at': datetime.now().isoformat(),
+            'slow_query_ms': slow_query_ms,
+            'startup': dict(_startup),
+            'calls': {name: h.to_dict(with_sql=True) for name, h in sorted(_calls.items())},
+            'phases': {name: h.to_dict() for name, h in sorted(_phases.items())},
+            'statements': {sql: h.to_dict() for sql, h in
+                           sorted(_statements.items(), key=lambda item: -item[1].total_ms)},
+            'slow_queries': list(_slow_queries),
+        }
+
+
+def dump(path: str = None) -> str:
+    import json  # нужен только при выходе, не при запуске
+    path = path or dump_path or "todo_profile.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot(), f, ensure_ascii=False, indent=2)
+    return path
+
+
+def reset():
+    with _lock:
+        _calls.clear()
+        _statements.clear()
+        _phases.clear()
+        _slow_queries.clear()
+
+
+configure_from_env()
\ No newline at end of file
@@ -1,11 +1,13 @@
 # main.py
+import instrumentation  # первым: от него отсчитываются этапы запуска
 import sys
 from PyQt6.QtWidgets import QApplication, QMessageBox, QSystemTrayIcon, QMenu
 from PyQt6.QtGui import QIcon, QAction
 from PyQt6.QtCore import Qt
-from database import init_db
+from database import close_connections
 from ui.main_window import MainWindow
-from services.task_service import get_overdue_alarms
+
+instrumentation.mark_startup('imports')
 
 class AppWithTray(MainWindow):
     def __init__(self):
@@ -23,6 +25,12 @@ class AppWithTray(MainWindow):
         show_action.triggered.connect(self.show)
         tray_menu.addAction(show_action)
 
+        if instrumentation.enabled:
+            # статистика запросов (TODO_PROFILE=1) — сохранить по запросу
+            stats_action = QAction("Сохранить статистику", self)
+            stats_action.triggered.connect(self.dump_stats)
+            tray_menu.addAction(stats_action)
+
         quit_action = QAction("Выход", self)
         quit_action.triggered.connect(self.quit_app)
         tray_menu.addAction(quit_action)
@@ -30,11 +38,11 @@ class AppWithTray(MainWindow):
         self.tray_icon.setContextMenu(tray_menu)
         self.tray_icon.activated.connect(self.tray_icon_activated)
 
-        # Проверка просроченных будильников при запуске
-        overdue_tasks = get_overdue_alarms()
-        if overdue_tasks:
-            count = len(overdue_tasks)
-            msg = f"У вас {count} незавершённых задач с прошедшим временем будильника."
+    def on_startup_loaded(self, first_page, overdue_count):
+        super().on_startup_loaded(first_page, overdue_count)
+        # Проверка просроченных будильников при запуске (посчитаны в StartupWorker)
+        if overdue_count:
+            msg = f"У вас {overdue_count} незавершённых задач с прошедшим временем будильника."
             QMessageBox.information(None, "Просроченные задачи", msg)
 
     def tray_icon_activated(self, reason):
@@ -46,12 +54,29 @@ class AppWithTray(MainWindow):
         event.ignore()
         self.hide()
 
+    def dump_stats(self):
+        try:
+            path = instrumentation.dump()
+            self.tray_icon.showMessage("Статистика", f"Сохранено в {path}")
+        except OSError as e:
+            print(f"Ошибка при сохранении статистики: {e}")
+
     def quit_app(self):
+        if self.startup_worker is not None:
+            self.startup_worker.wait()
+        self.stop_maintenance()
+        self.change_feed.stop()
         self.alarm_manager.quit()
+        self.alarm_manager.wait()
+        self.notifier.stop(1)  # показ уведомления может зависнуть в системной службе
+        self.list_view.shutdown()
+        if instrumentation.enabled and instrumentation.dump_path:
+            self.dump_stats()
+        close_connections()
         QApplication.quit()
 
 if __name__ == "__main__":
-    init_db()
+    # база открывается и мигрирует в StartupWorker после первой отрисовки окна
     app = QApplication(sys.argv)
     window = AppWithTray()
     window.show()
@@ -1,23 +1,168 @@
 # models.py
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+# ранг приоритета хранится в базе и в Task числом: меньше — важнее
+PRIORITY_NAMES = ('high', 'normal', 'low')
+PRIORITY_RANKS = {name: rank for rank, name in enumerate(PRIORITY_NAMES)}
+DEFAULT_PRIORITY = PRIORITY_RANKS['normal']
+
 
 @dataclass
 class Task:
+    # __slots__ вместо __dict__: задач в памяти может быть миллион
+    __slots__ = ('id', 'text', 'completed', 'priority', 'created_at', 'alarm_time')
     id: int
     text: str
-    completed: bool
-    priority: str  # 'low', 'normal', 'high'
-    created_at: str  # ISO format
-    alarm_time: str = None  # ISO format or None
+    completed: int  # 0/1 как в базе
+    priority: int  # ранг из PRIORITY_NAMES
+    created_at: float  # секунды epoch
+    alarm_time: Optional[float]  # секунды epoch или None
 
     @classmethod
     def from_row(cls, row):
-        return cls(
-            id=row[0],
-            text=row[1],
-            completed=bool(row[2]),
-            priority=row[3],
-            created_at=row[4],
-            alarm_time=row[5]
-        )
\ No newline at end of file
+        # колонки выбираются ровно в порядке полей: id, text, completed, priority, created_at, alarm_time
+        return cls(*row)
+
+    @property
+    def priority_name(self) -> str:
+        return PRIORITY_NAMES[self.priority]
+
+
+def priority_rank(value) -> int:
+    # принимает имя ('high'/'normal'/'low') или ранг
+    if isinstance(value, str):
+        rank = PRIORITY_RANKS.get(value)
+    elif isinstance(value, int) and 0 <= value < len(PRIORITY_NAMES):
+        rank = value
+    else:
+        rank = None
+    if rank is None:
+        raise ValueError("Invalid priority")
+    return rank
+
+
+def to_epoch(value) -> Optional[float]:
+    # ISO-строка (локальное время), datetime или число секунд -> секунды epoch
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    raise ValueError(f"Invalid time: {value!r}")
+
+
+def to_iso(epoch: Optional[float]) -> Optional[str]:
+    return None if epoch is None else datetime.fromtimestamp(epoch).isoformat()
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _micros(epoch: Optional[float]) -> str:
+    # время в хэше округляется до микросекунд так же, как в ISO-строке экспорта,
+    # иначе задача после экспорта и импорта не совпала бы сама с собой
+    if epoch is None:
+        return ''
+    return str((datetime.fromtimestamp(epoch, timezone.utc) - _EPOCH) // _MICROSECOND)
+
+
+def content_hash(text: str, created_at: Optional[float], alarm_time: Optional[float]) -> int:
+    # Стабильный между запусками 64-битный хэш содержимого задачи (колонка
+    # tasks.content_hash): по нему повторный импорт узнаёт уже добавленные задачи.
+    # Считается при добавлении задачи и пересчитывается при каждой смене текста
+    # или будильника (task_service._refresh_content_hashes).
+    import hashlib  # не грузится при запуске, только при первой записи
+    key = f"{text}\x1f{_micros(created_at)}\x1f{_micros(alarm_time)}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big', signed=True)
+
+
+# единицы интервала повторения будильника (Recurrence.unit)
+REPEAT_UNITS = ('day', 'week', 'month')
+
+
+@dataclass(frozen=True)
+class Recurrence:
+    # Правило повторения будильника: раз в every единиц unit, пока не наступит
+    # until и не кончится count. Хранится в колонках repeat_* задачи (миграция 8),
+    # серия в строки не разворачивается — в alarm_time лежит только ближайшее
+    # срабатывание. Шаг отсчитывается от сработавшего будильника по местному
+    # времени: ежедневный в 9:00 остаётся в 9:00 и после перевода часов.
+    unit: str
+    every: int = 1
+    until: Optional[float] = None  # секунды epoch: позже этого срабатываний нет
+    count: Optional[int] = None  # сколько раз ещё сработает, включая ближайший
+
+    def __post_init__(self):
+        if self.unit not in REPEAT_UNITS:
+            raise ValueError(f"Invalid repeat unit: {self.unit!r}")
+        if self.every < 1 or (self.count is not None and self.count < 1):
+            raise ValueError("Invalid recurrence")
+
+    @classmethod
+    def from_columns(cls, unit, every, until, count) -> Optional['Recurrence']:
+        # колонки repeat_unit, repeat_every, repeat_until, repeat_count
+        return None if unit is None else cls(unit, every, until, count)
+
+    def columns(self) -> tuple:
+        return self.unit, self.every, self.until, self.count
+
+    def advance(self, alarm_time: float, now: float) -> Tuple[Optional[float], Optional[int]]:
+        # (следующее срабатывание, новый count) после будильника alarm_time;
+        # (None, None) — серия закончилась. Пропущенные срабатывания (компьютер
+        # спал) не догоняются и count не расходуют.
+        if self.count == 1:
+            return None, None
+        after = max(now, alarm_time)
+        start = datetime.fromtimestamp(alarm_time)
+        if self.unit == 'month':
+            when = self._next_month(start, datetime.fromtimestamp(after))
+        else:
+            days = self.every * (7 if self.unit == 'week' else 1)
+            # оценка по секундам может ошибиться на шаг из-за перевода часов
+            k = max(1, int((after - alarm_time) // (days * 86400)))
+            while k > 1 and (start + timedelta(days=(k - 1) * days)).timestamp() > after:
+                k -= 1
+            while (start + timedelta(days=k * days)).timestamp() <= after:
+                k += 1
+            when = (start + timedelta(days=k * days)).timestamp()
+        if self.until is not None and when > self.until:
+            return None, None
+        return when, None if self.count is None else self.count - 1
+
+    def _next_month(self, start: datetime, after: datetime) -> float:
+        # то же число месяца; месяцы, где его нет (31-е, 29 февраля), пропускаются
+        k = max(1, ((after.year - start.year) * 12 + after.month - start.month) // self.every)
+        while True:
+            month = start.month - 1 + k * self.every
+            try:
+                when = start.replace(year=start.year + month // 12, month=month % 12 + 1).timestamp()
+            except ValueError:
+                when = None
+            if when is not None and when > after.timestamp():
+                return when
+            k += 1
+
+
+@dataclass
+class TaskChanges:
+    inserted: List[Task] = field(default_factory=list)
+    updated: List[Task] = field(default_factory=list)  # новые значения изменённых задач
+    deleted: List[int] = field(default_factory=list)  # id удалённых задач
+    reset: bool = False  # изменилось неизвестно что (например, импорт) — перечитать всё
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    updated: int = 0  # только в режиме обновления и только если что-то изменилось
+    skipped: int = 0  # уже были в базе или в архиве, либо повторялись в файле
+
+    @property
+    def processed(self) -> int:
+        return self.inserted + self.updated + self.skipped
\ No newline at end of file
@@ -0,0 +1,77 @@
+# notifications.py
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+
+def _plyer_notify(title: str, message: str):
+    from plyer import notification  # грузится при первом уведомлении, не при старте
+    notification.notify(title=title, message=message, timeout=10)
+
+
+class NotificationDispatcher:
+    # Уведомления о будильниках показываются отдельным потоком: вызов plyer
+    # может подолгу ждать системную службу уведомлений, GUI-поток его не ждёт.
+    # Не чаще одного уведомления в MIN_INTERVAL; если к очередному показу
+    # накопилось больше SUMMARY_THRESHOLD задач (выход из сна, импорт
+    # с прошедшими будильниками), они сворачиваются в одно «N задач».
+    MIN_INTERVAL = 2.0  # секунд
+    SUMMARY_THRESHOLD = 3
+    SUMMARY_LINES = 5  # задач, перечисленных в сводном уведомлении
+    TITLE = "Напоминание"
+
+    def __init__(self, notify: Optional[Callable[[str, str], None]] = None,
+                 min_interval: Optional[float] = None):
+        # notify(title, message) — показ уведомления, по умолчанию через plyer
+        self.notify = notify or _plyer_notify
+        self.min_interval = self.MIN_INTERVAL if min_interval is None else min_interval
+        self._cond = threading.Condition()
+        self._pending: List[str] = []  # тексты задач в порядке срабатывания
+        self._stopping = False
+        self._shown_at = float('-inf')
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def post(self, alarms: Iterable[Tuple[int, str]]):
+        # (task_id, текст) сработавших будильников; не блокирует
+        with self._cond:
+            self._pending.extend(text for _, text in alarms)
+            self._cond.notify()
+
+    def stop(self, timeout: Optional[float] = None):
+        # непоказанное отбрасывается: при выходе уведомлять уже некому
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    wait = self._shown_at + self.min_interval - time.monotonic()
+                    if self._pending and wait <= 0:
+                        break
+                    self._cond.wait(wait if self._pending else None)
+                if self._stopping:
+                    return
+                if len(self._pending) > self.SUMMARY_THRESHOLD:
+                    batch, self._pending = self._pending, []
+                else:
+                    batch = [self._pending.pop(0)]
+                self._shown_at = time.monotonic()
+            try:
+                self.notify(*self._message(batch))
+            except Exception as e:
+                print(f"Ошибка при показе уведомления: {e}")
+
+    def _message(self, texts: List[str]) -> Tuple[str, str]:
+        if len(texts) == 1:
+            return self.TITLE, f"Задача: {texts[0]}"
+        lines = [f"• {text}" for text in texts[:self.SUMMARY_LINES]]
+        if len(texts) > self.SUMMARY_LINES:
+            lines.append(f"и ещё {len(texts) - self.SUMMARY_LINES}")
+        return f"{self.TITLE}: {len(texts)} задач", "\n".join(lines)
\ No newline at end of file
@@ -0,0 +1,83 @@
+# services/alarm_scheduler.py
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+from models import Task, TaskChanges, to_epoch
+
+
+def parse_alarm_time(alarm_time) -> Optional[float]:
+    # Task.alarm_time уже в секундах epoch; ISO-строки принимаются по-прежнему
+    try:
+        return to_epoch(alarm_time)
+    except (TypeError, ValueError):
+        return None
+
+
+class AlarmScheduler:
+    # Min-куча (время срабатывания, task_id) с ленивым удалением:
+    # актуальная запись задачи хранится в _entries, устаревшие элементы кучи
+    # отбрасываются при извлечении.
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int]] = []
+        self._entries: Dict[int, Tuple[float, str]] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, tasks: Iterable[Task]):
+        self._entries = {}
+        for task in tasks:
+            when = parse_alarm_time(task.alarm_time)
+            if when is not None and not task.completed:
+                self._entries[task.id] = (when, task.text)
+        self._rebuild()
+
+    def schedule(self, task_id: int, alarm_time: float, text: str):
+        when = parse_alarm_time(alarm_time)
+        if when is None:
+            self.unschedule(task_id)
+            return
+        previous = self._entries.get(task_id)
+        self._entries[task_id] = (when, text)
+        if previous is None or previous[0] != when:
+            heapq.heappush(self._heap, (when, task_id))
+            if len(self._heap) > 2 * len(self._entries) + 64:
+                self._rebuild()
+
+    def unschedule(self, task_id: int):
+        self._entries.pop(task_id, None)
+
+    def apply(self, changes: TaskChanges):
+        for task in changes.inserted + changes.updated:
+            if task.alarm_time is not None and not task.completed:
+                self.schedule(task.id, task.alarm_time, task.text)
+            else:
+                self.unschedule(task.id)
+        for task_id in changes.deleted:
+            self.unschedule(task_id)
+
+    def next_deadline(self) -> Optional[float]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[Tuple[int, str]]:
+        fired = []
+        while self._heap and self._heap[0][0] <= now:
+            when, task_id = heapq.heappop(self._heap)
+            entry = self._entries.get(task_id)
+            if entry is not None and entry[0] == when:
+                del self._entries[task_id]
+                fired.append((task_id, entry[1]))
+        return fired
+
+    def _drop_stale(self):
+        while self._heap:
+            when, task_id = self._heap[0]
+            entry = self._entries.get(task_id)
+            if entry is not None and entry[0] == when:
+                return
+            heapq.heappop(self._heap)
+
+    def _rebuild(self):
+        self._heap = [(when, task_id) for task_id, (when, _) in self._entries.items()]
+        heapq.heapify(self._heap)
\ No newline at end of file
@@ -0,0 +1,110 @@
+# services/archive_service.py
+# Архив завершённых задач: таблица tasks_archive в той же базе (миграция 5).
+# Задачи переносятся туда небольшими транзакциями в фоне и возвращаются
+# в tasks по запросу; для списка задач перенос выглядит как удаление.
+import os
+import re
+import time
+from typing import Callable, Iterable, List
+from database import get_connection, transaction
+from instrumentation import timed
+from models import Task, TaskChanges
+from services.task_service import FREE_HASH_SQL, notify_changes
+
+# завершённые задачи старше этого срока (дней с completed_at) уходят в архив;
+# TODO_ARCHIVE_DAYS=-1 отключает архивацию
+ARCHIVE_AFTER_DAYS = float(os.environ.get('TODO_ARCHIVE_DAYS', 30))
+# задач на одну транзакцию: запись из GUI не ждёт дольше одной пачки
+BATCH_SIZE = 500
+
+# колонки Task.from_row: в архиве только завершённые задачи
+_ARCHIVE_COLUMNS = "a.id, a.text, 1, a.priority, a.created_at, a.alarm_time"
+
+
+def _has_archive_search() -> bool:
+    row = get_connection().execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_archive_fts'").fetchone()
+    return row is not None
+
+
+@timed
+def archive_completed(older_than_days: float = None,
+                      progress: Callable[[int], None] = None) -> int:
+    # переносит пачками, пока есть что переносить; возвращает число задач
+    days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    if days < 0:
+        return 0
+    cutoff = time.time() - days * 86400
+    archived = 0
+    while True:
+        with transaction() as conn:
+            # idx_tasks_completed_at: самые давно завершённые — первыми
+            task_ids = [row[0] for row in conn.execute(
+                "SELECT id FROM tasks WHERE completed = 1 AND completed_at < ? ORDER BY completed_at LIMIT ?",
+                (cutoff, BATCH_SIZE))]
+            if not task_ids:
+                break
+            placeholders = ','.join('?' * len(task_ids))
+            conn.execute(
+                "INSERT INTO tasks_archive (id, text, priority, created_at, alarm_time, completed_at, content_hash, archived_at) "
+                f"SELECT id, text, priority, created_at, alarm_time, completed_at, content_hash, ? FROM tasks WHERE id IN ({placeholders})",
+                [time.time()] + task_ids)
+            conn.execute(f"DELETE FROM tasks WHERE id IN ({placeholders})", task_ids)
+        archived += len(task_ids)
+        notify_changes(TaskChanges(deleted=task_ids))
+        if progress:
+            progress(archived)
+    return archived
+
+
+@timed
+def restore_tasks(task_ids: Iterable[int]) -> List[Task]:
+    # задачи возвращаются завершёнными под прежними id; срок до повторной
+    # архивации отсчитывается заново. Хэш, который пока занял импорт той же
+    # задачи, не возвращается — восстановленная остаётся без него
+    task_ids = list(task_ids)
+    restored = []
+    now = time.time()
+    with transaction() as conn:
+        for i in range(0, len(task_ids), BATCH_SIZE):
+            chunk = task_ids[i:i + BATCH_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f"SELECT {_ARCHIVE_COLUMNS}, a.content_hash FROM tasks_archive a WHERE a.id IN ({placeholders})",
+                chunk).fetchall()
+            conn.executemany(
+                "INSERT INTO tasks (id, text, completed, priority, created_at, alarm_time, content_hash, completed_at) "
+                f"VALUES (?, ?, ?, ?, ?, ?, {FREE_HASH_SQL}, ?)",
+                [row + (row[-1], now) for row in rows])
+            conn.execute(f"DELETE FROM tasks_archive WHERE id IN ({placeholders})", chunk)
+            restored.extend(Task.from_row(row[:-1]) for row in rows)
+    if restored:
+        notify_changes(TaskChanges(inserted=restored))
+    return restored
+
+
+@timed
+def search_archive(query: str = '', limit: int = 200) -> List[Task]:
+    # слова ищутся как префиксы (как search_tasks); пустой запрос — недавно архивированные
+    words = re.findall(r'\w+', query)
+    conn = get_connection()
+    if not words:
+        rows = conn.execute(
+            f"SELECT {_ARCHIVE_COLUMNS} FROM tasks_archive a ORDER BY a.archived_at DESC, a.id DESC LIMIT ?",
+            (limit,))
+    elif _has_archive_search():
+        rows = conn.execute(
+            f"SELECT {_ARCHIVE_COLUMNS} FROM tasks_archive_fts JOIN tasks_archive a ON a.id = tasks_archive_fts.rowid "
+            "WHERE tasks_archive_fts MATCH ? ORDER BY tasks_archive_fts.rank, a.id LIMIT ?",
+            (' '.join(f'"{word}"*' for word in words), limit))
+    else:
+        rows = conn.execute(
+            f"SELECT {_ARCHIVE_COLUMNS} FROM tasks_archive a WHERE "
+            + " AND ".join("a.text LIKE ?" for _ in words) + " ORDER BY a.archived_at DESC, a.id DESC LIMIT ?",
+            [f"%{word}%" for word in words] + [limit])
+    return [Task.from_row(row) for row in rows.fetchall()]
+
+
+@timed
+def archived_count() -> int:
+    return get_connection().execute("SELECT COUNT(*) FROM tasks_archive").fetchone()[0]
\ No newline at end of file
@@ -0,0 +1,93 @@
+# services/change_feed.py
+import sqlite3
+import threading
+from typing import Optional
+from database import change_version, get_connection, take_local_changes, track_local_changes
+from models import TaskChanges
+from services.task_service import fetch_tasks, notify_changes
+
+
+class ChangeFeed:
+    # Изменения, записанные в базу другими процессами (второй экземпляр
+    # приложения, скрипт), читаются из журнала task_changes (миграция 7) и
+    # рассылаются обычным notify_changes — список, репозиторий и AlarmManager
+    # применяют их так же, как свои. Поток раз в POLL_INTERVAL спрашивает
+    # PRAGMA data_version у своего соединения: пока в базу никто не писал,
+    # журнал даже не читается. Свои записи процесс уже разослал сам — их
+    # версии отмечает database.transaction(), и здесь они пропускаются.
+    POLL_INTERVAL = 0.5  # секунд
+    # больше изменённых задач за раз — дешевле перечитать всё, чем выбирать по id
+    MAX_DELTA = 10000
+
+    def __init__(self, poll_interval: Optional[float] = None):
+        self.poll_interval = self.POLL_INTERVAL if poll_interval is None else poll_interval
+        self._version = 0  # последняя прочитанная версия журнала
+        self._data_version = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+
+    def start(self):
+        # всё, что записано после start(), будет разослано
+        track_local_changes(True)
+        self._version = change_version(get_connection())
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        track_local_changes(False)
+
+    def poll(self) -> Optional[TaskChanges]:
+        # изменения других процессов с прошлого вызова; None — их не было
+        conn = get_connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return None
+        self._data_version = data_version
+        # журнал и задачи — из одного снимка базы
+        conn.execute("BEGIN")
+        try:
+            return self._read_changes(conn)
+        finally:
+            conn.execute("COMMIT")
+
+    def _read_changes(self, conn) -> Optional[TaskChanges]:
+        rows = conn.execute(
+            "SELECT version, task_id FROM task_changes WHERE version > ? ORDER BY version",
+            (self._version,)).fetchall()
+        if not rows:
+            return None
+        # версии идут подряд; пропуск значит, что maintain() обрезал непрочитанное
+        reset = rows[0][0] > self._version + 1
+        self._version = rows[-1][0]
+        local = take_local_changes(self._version)
+        task_ids = set()
+        span = 0
+        for version, task_id in rows:
+            while span < len(local) and local[span][1] < version:
+                span += 1
+            if span < len(local) and local[span][0] < version:
+                continue  # записано этим процессом
+            if task_id is None:
+                reset = True
+            else:
+                task_ids.add(task_id)
+        if reset or len(task_ids) > self.MAX_DELTA:
+            return TaskChanges(reset=True)
+        if not task_ids:
+            return None
+        # задача, которой уже нет, удалена; остальные — новые значения
+        tasks = fetch_tasks(task_ids)
+        found = {task.id for task in tasks}
+        return TaskChanges(updated=tasks, deleted=sorted(task_ids - found))
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                changes = self.poll()
+            except sqlite3.Error as e:
+                print(f"Ошибка чтения журнала изменений: {e}")
+                continue
+            if changes is not None:
+                notify_changes(changes)
\ No newline at end of file
@@ -0,0 +1,103 @@
+# services/export_service.py
+import csv
+import heapq
+from itertools import islice
+from json.encoder import encode_basestring
+import os
+from pathlib import Path
+from typing import Callable, Optional
+from database import get_connection
+from instrumentation import timed
+from models import PRIORITY_NAMES, to_iso
+
+FETCH_SIZE = 10000  # строк на один fetchmany и одну запись в файл
+FORMATS = ('json', 'ndjson', 'csv')
+CSV_COLUMNS = ('text', 'completed', 'priority', 'created_at', 'alarm_time')
+
+# расширение файла -> формат; остальные пишутся JSON-массивом
+_EXTENSIONS = {'.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv'}
+
+
+def format_for_path(file_path: str) -> str:
+    return _EXTENSIONS.get(Path(file_path).suffix.lower(), 'json')
+
+
+def _json_record(row) -> str:
+    # тот же вид, что принимает import_service: имена приоритетов и ISO-даты.
+    # Поля фиксированы, поэтому строка собирается шаблоном — это в несколько
+    # раз быстрее json.dumps на словарь; экранируется только текст задачи.
+    _, text, completed, priority, created_at, alarm_time = row
+    alarm = 'null' if alarm_time is None else f'"{to_iso(alarm_time)}"'
+    return (f'{{"text": {encode_basestring(text)}, "completed": {"true" if completed else "false"}, '
+            f'"priority": "{PRIORITY_NAMES[priority]}", "created_at": "{to_iso(created_at)}", "alarm_time": {alarm}}}')
+
+
+def _csv_record(row) -> tuple:
+    _, text, completed, priority, created_at, alarm_time = row
+    return text, completed, PRIORITY_NAMES[priority], to_iso(created_at), to_iso(alarm_time)
+
+
+@timed
+def export_tasks(file_path: str, completed_filter: Optional[bool] = None, fmt: Optional[str] = None,
+                 progress: Callable[[int, float], None] = None, include_archive: bool = True) -> int:
+    # Задачи пишутся в файл пачками по FETCH_SIZE строк прямо из курсора,
+    # поэтому память не зависит от числа задач. Порядок — по id, как были
+    # добавлены: повторный импорт файла сохраняет его. Файл сначала пишется
+    # рядом под временным именем и подменяет старый, только если всё записано.
+    # Архивные задачи (они завершены) по умолчанию выгружаются вместе со всеми
+    # и с завершёнными; include_archive=False — только список задач.
+    # progress(экспортировано задач, доля 0..1)
+    fmt = fmt or format_for_path(file_path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат экспорта: {fmt}")
+    where, params = ("WHERE completed = ?", (int(completed_filter),)) if completed_filter is not None else ("", ())
+    include_archive = include_archive and completed_filter is not False
+
+    conn = get_connection()
+    tmp_path = f"{file_path}.tmp"
+    exported = 0
+    # одна читающая транзакция: счётчик и строки из одного снимка базы,
+    # запись в неё из других потоков не блокируется (WAL)
+    conn.execute("BEGIN")
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM tasks {where}", params).fetchone()[0]
+        cursor = conn.execute(
+            f"SELECT id, text, completed, priority, created_at, alarm_time FROM tasks {where} ORDER BY id", params)
+        if include_archive:
+            total += conn.execute("SELECT COUNT(*) FROM tasks_archive").fetchone()[0]
+            # архив хранит прежние id: слияние двух упорядоченных курсоров
+            # сохраняет общий порядок без сортировки в памяти
+            cursor = heapq.merge(cursor, conn.execute(
+                "SELECT id, text, 1, priority, created_at, alarm_time FROM tasks_archive ORDER BY id"))
+        total = total or 1
+        with open(tmp_path, 'w', encoding='utf-8-sig' if fmt == 'csv' else 'utf-8', newline='') as f:
+            if fmt == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(CSV_COLUMNS)
+            elif fmt == 'json':
+                f.write('[')
+            while True:
+                rows = list(islice(cursor, FETCH_SIZE))
+                if not rows:
+                    break
+                if fmt == 'csv':
+                    writer.writerows(map(_csv_record, rows))
+                elif fmt == 'json':
+                    f.write((',\n' if exported else '') + ',\n'.join(map(_json_record, rows)))
+                else:
+                    f.write('\n'.join(map(_json_record, rows)) + '\n')
+                exported += len(rows)
+                if progress:
+                    progress(exported, min(exported / total, 1.0))
+            if fmt == 'json':
+                f.write(']')
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        conn.execute("COMMIT")
+    if progress:
+        progress(exported, 1.0)
+    return exported
\ No newline at end of file
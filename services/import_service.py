@@ -1,24 +1,255 @@
 # services/import_service.py
+import codecs
+import csv
+import io
 import json
+import os
+import time
 from pathlib import Path
-from database import get_connection
-from datetime import datetime
-
-def import_from_json(file_path: str):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        tasks = json.load(f)
-
-    conn = get_connection()
-    cursor = conn.cursor()
-    for task in tasks:
-        created = task.get('created_at', datetime.now().isoformat())
-        completed = int(task.get('completed', False))
-        priority = task.get('priority', 'normal')
-        if priority not in ('low', 'normal', 'high'):
-            priority = 'normal'
-        cursor.execute(
-            "INSERT INTO tasks (text, completed, priority, created_at, alarm_time) VALUES (?, ?, ?, ?, ?)",
-            (task['text'], completed, priority, created, task.get('alarm_time', None))
-        )
-    conn.commit()
-    conn.close()
\ No newline at end of file
+from typing import Callable, Iterator, Optional
+from database import changes_deferred, get_connection, transaction, text_search_deferred
+from instrumentation import timed
+from models import ImportResult, TaskChanges, DEFAULT_PRIORITY, content_hash, priority_rank, to_epoch
+from services.task_service import notify_changes
+
+READ_CHUNK_SIZE = 1 << 16  # байт за одно чтение файла
+BATCH_SIZE = 10000  # строк на один executemany и одну транзакцию
+MAX_RECORD_SIZE = 1 << 24  # защита от чтения всего файла в память при битом JSON
+
+# Что делать с задачей, которая уже есть в базе (тот же content_hash):
+# 'skip' — пропустить, 'update' — взять из файла отметку о завершении и приоритет
+IMPORT_MODES = {
+    'skip': "NOTHING",
+    'update': ("UPDATE SET completed = excluded.completed, priority = excluded.priority "
+               "WHERE completed != excluded.completed OR priority != excluded.priority"),
+}
+
+_WHITESPACE = ' \t\r\n'
+
+
+def _iter_json_records(f) -> Iterator[dict]:
+    # Потоковый разбор: JSON-массив объектов или NDJSON (по объекту на строку).
+    # В памяти держится только необработанный хвост буфера. Ошибки — с местом
+    # в файле, как у json.load.
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buf = ''
+    pos = 0
+    eof = False
+    offset = 0  # символов файла до начала buf
+    lines = 0  # переводов строки до начала buf
+    line_start = 0  # номер символа, с которого начинается последняя из них строка
+
+    def fill():
+        nonlocal buf, pos, eof, offset, lines, line_start
+        newline = buf.rfind('\n', 0, pos)
+        if newline >= 0:
+            lines += buf.count('\n', 0, pos)
+            line_start = offset + newline + 1
+        offset += pos
+        chunk = f.read(READ_CHUNK_SIZE)
+        buf = buf[pos:] + text_decoder.decode(chunk, final=not chunk)
+        pos = 0
+        eof = not chunk
+
+    def error(message, at):
+        newline = buf.rfind('\n', 0, at)
+        column = at - newline if newline >= 0 else offset + at - line_start + 1
+        return ValueError(f"{message}: строка {lines + buf.count(chr(10), 0, at) + 1}, "
+                          f"столбец {column} (символ {offset + at})")
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    in_array = pos < len(buf) and buf[pos] == '['
+    if in_array:
+        pos += 1
+        skip_whitespace()
+        if pos < len(buf) and buf[pos] == ']':
+            return
+
+    while True:
+        skip_whitespace()
+        if pos >= len(buf):
+            if in_array:
+                raise error("Неожиданный конец файла: массив не закрыт", pos)
+            return
+        while True:
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if eof or len(buf) - pos > MAX_RECORD_SIZE:
+                    raise error(e.msg, e.pos) from None
+                fill()
+                continue
+            # значение у самого конца буфера могло быть обрезано — дочитываем
+            if end >= len(buf) and not eof:
+                fill()
+                continue
+            break
+        if not isinstance(record, dict):
+            raise error("Ожидался объект задачи", pos)
+        pos = end
+        yield record
+        if not in_array:
+            continue
+        # после элемента массива — только ',' и следующий элемент или ']';
+        # экспорт пишет ',' сразу за объектом, поэтому она проверяется первой
+        if pos < len(buf) and buf[pos] == ',':
+            pos += 1
+            continue
+        skip_whitespace()
+        if pos >= len(buf):
+            raise error("Неожиданный конец файла: массив не закрыт", pos)
+        if buf[pos] == ',':
+            pos += 1
+            continue
+        if buf[pos] != ']':
+            raise error("Ожидалась ',' или ']'", pos)
+        pos += 1
+        skip_whitespace()
+        if pos < len(buf):
+            raise error("Лишние данные после массива", pos)
+        return
+
+
+def _iter_csv_records(f) -> Iterator[dict]:
+    # CSV с заголовком text,completed,priority,created_at,alarm_time (как пишет экспорт)
+    text = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+    try:
+        for record in csv.DictReader(text):
+            completed = (record.get('completed') or '').strip().lower()
+            record['completed'] = completed in ('1', 'true', 'yes')
+            yield record
+    finally:
+        text.detach()  # файл закрывает вызывающий, f.tell() нужен для прогресса
+
+
+def _parse_time(value) -> Optional[float]:
+    # ISO-строка или секунды epoch -> секунды epoch
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return None
+    try:
+        return to_epoch(value)
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def _normalize(task: dict, now: float):
+    text = task.get('text')
+    if not isinstance(text, str) or not text.strip():
+        return None
+    created = _parse_time(task.get('created_at'))
+    alarm = _parse_time(task.get('alarm_time'))
+    completed = int(bool(task.get('completed', False)))
+    try:
+        priority = priority_rank(task.get('priority', 'normal'))
+    except ValueError:
+        priority = DEFAULT_PRIORITY
+    # хэш — от значений из файла: у задачи без даты создания created_at при
+    # каждом импорте своё, а повторный импорт должен её узнать
+    digest = content_hash(text, created, alarm)
+    created = created or now
+    # completed_at — момент импорта, а не created_at (как сделал бы триггер
+    # tasks_completed_insert): иначе давно завершённые задачи из файла сразу
+    # ушли бы в архив, а не через ARCHIVE_AFTER_DAYS
+    return (text, completed, priority, created, alarm, now if completed else None, digest)
+
+
+def _archived_hashes(conn, batch) -> set:
+    # задачи, уже перенесённые в архив, тоже считаются добавленными
+    hashes = [row[6] for row in batch]
+    found = set()
+    for i in range(0, len(hashes), 500):
+        chunk = hashes[i:i + 500]
+        found.update(row[0] for row in conn.execute(
+            f"SELECT content_hash FROM tasks_archive WHERE content_hash IN ({','.join('?' * len(chunk))})", chunk))
+    return found
+
+
+def _insert_batch(batch, mode: str, check_archive: bool) -> ImportResult:
+    result = ImportResult()
+    with transaction() as conn, text_search_deferred(conn), changes_deferred(conn):
+        if check_archive:
+            archived = _archived_hashes(conn, batch)
+            if archived:
+                rows = [row for row in batch if row[6] not in archived]
+                result.skipped += len(batch) - len(rows)
+                batch = rows
+        # транзакция держит блокировку записи: всё, что новее last_id, вставлено этой пачкой
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0]
+        changed = conn.executemany(
+            "INSERT INTO tasks (text, completed, priority, created_at, alarm_time, completed_at, content_hash) "
+            f"VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (content_hash) DO {IMPORT_MODES[mode]}",
+            batch
+        ).rowcount
+        result.inserted = conn.execute("SELECT COUNT(*) FROM tasks WHERE id > ?", (last_id,)).fetchone()[0]
+    result.updated = changed - result.inserted
+    result.skipped += len(batch) - changed
+    return result
+
+
+def _import_records(file_path: str, iter_records, progress: Callable[[int, float], None] = None,
+                    mode: str = 'skip') -> ImportResult:
+    # progress(обработано задач, доля прочитанного файла 0..1)
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Неизвестный режим импорта: {mode}")
+    total_bytes = os.path.getsize(file_path) or 1
+    now = time.time()
+    result = ImportResult()
+    check_archive = get_connection().execute("SELECT EXISTS (SELECT 1 FROM tasks_archive)").fetchone()[0]
+    batch = []
+
+    def flush():
+        done = _insert_batch(batch, mode, check_archive)
+        result.inserted += done.inserted
+        result.updated += done.updated
+        result.skipped += done.skipped
+
+    try:
+        with open(file_path, 'rb') as f:
+            for task in iter_records(f):
+                row = _normalize(task, now)
+                if row is None:
+                    continue
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    flush()
+                    batch = []
+                    if progress:
+                        progress(result.processed, min(f.tell() / total_bytes, 1.0))
+            if batch:
+                flush()
+    finally:
+        if result.inserted or result.updated:
+            notify_changes(TaskChanges(reset=True))
+    if progress:
+        progress(result.processed, 1.0)
+    return result
+
+
+@timed
+def import_from_json(file_path: str, progress: Callable[[int, float], None] = None,
+                     mode: str = 'skip') -> ImportResult:
+    return _import_records(file_path, _iter_json_records, progress, mode)
+
+
+@timed
+def import_from_csv(file_path: str, progress: Callable[[int, float], None] = None,
+                    mode: str = 'skip') -> ImportResult:
+    return _import_records(file_path, _iter_csv_records, progress, mode)
+
+
+def import_tasks(file_path: str, progress: Callable[[int, float], None] = None,
+                 mode: str = 'skip') -> ImportResult:
+    # формат по расширению: .csv — CSV, остальное — JSON-массив или NDJSON
+    if Path(file_path).suffix.lower() == '.csv':
+        return import_from_csv(file_path, progress, mode)
+    return import_from_json(file_path, progress, mode)
\ No newline at end of file
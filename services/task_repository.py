@@ -0,0 +1,156 @@
+# services/task_repository.py
+import threading
+from typing import Dict, List, Optional
+from models import Task, TaskChanges
+from services.task_service import (
+    SORT_KEYS, get_all_tasks, add_change_listener, remove_change_listener
+)
+
+
+def bisect_tasks(tasks: List[Task], key: tuple, sort_key) -> int:
+    # бинарный поиск по ключу без хранения списка ключей: O(log n) вызовов sort_key
+    lo, hi = 0, len(tasks)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if sort_key(tasks[mid]) < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class TaskRepository:
+    # Задачи загружаются из базы один раз; для каждой части (активные/завершённые)
+    # и каждого вида сортировки хранится упорядоченный список. Изменения
+    # записываются в SQLite сервисом, а сюда приходят через его уведомления
+    # и вносятся точечно: позиция ищется за O(log n).
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_id: Dict[int, Task] = {}
+        self._indexes: Dict[tuple, List[Task]] = {}  # (completed, sort_by) -> задачи
+        self._pending: Optional[List[TaskChanges]] = None  # изменения, пришедшие во время загрузки
+        self.loaded = False
+
+    def load(self):
+        # может выполняться в фоновом потоке: изменения, пришедшие во время
+        # чтения, откладываются и применяются поверх загруженного снимка
+        with self._lock:
+            self._pending = []
+        tasks = get_all_tasks()
+        by_id = {task.id: task for task in tasks}
+        indexes = {}
+        for completed in (False, True):
+            part = [task for task in tasks if task.completed == completed]
+            for sort_by, sort_key in SORT_KEYS.items():
+                indexes[(completed, sort_by)] = sorted(part, key=sort_key)
+        with self._lock:
+            self._by_id = by_id
+            self._indexes = indexes
+            pending, self._pending = self._pending, None
+            self.loaded = True
+            for changes in pending:
+                self.apply_changes(changes)
+
+    def attach(self):
+        add_change_listener(self.apply_changes)
+
+    def detach(self):
+        remove_change_listener(self.apply_changes)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def get(self, task_id: int) -> Optional[Task]:
+        return self._by_id.get(task_id)
+
+    def tasks(self, completed_filter: Optional[bool] = None, sort_by: str = 'priority') -> List[Task]:
+        # все ключи сортировки начинаются с completed, поэтому «все задачи» —
+        # это активные, за которыми идут завершённые
+        if sort_by not in SORT_KEYS:
+            sort_by = 'priority'
+        with self._lock:
+            if completed_filter is None:
+                return self._indexes[(False, sort_by)] + self._indexes[(True, sort_by)]
+            return list(self._indexes[(bool(completed_filter), sort_by)])
+
+    def page(self, completed_filter: Optional[bool] = None, sort_by: str = 'priority',
+             after: Optional[tuple] = None, limit: int = 100) -> List[Task]:
+        # то же, что task_service.get_tasks_page, но из памяти
+        if sort_by not in SORT_KEYS:
+            sort_by = 'priority'
+        sort_key = SORT_KEYS[sort_by]
+        with self._lock:
+            if completed_filter is None:
+                parts = [self._indexes[(False, sort_by)], self._indexes[(True, sort_by)]]
+            else:
+                parts = [self._indexes[(bool(completed_filter), sort_by)]]
+            result = []
+            for tasks in parts:
+                start = 0
+                if after is not None:
+                    start = bisect_tasks(tasks, after, sort_key)
+                    if start < len(tasks) and sort_key(tasks[start]) == after:
+                        start += 1
+                result.extend(tasks[start:start + limit - len(result)])
+                if len(result) >= limit:
+                    break
+            return result
+
+    def apply_changes(self, changes: TaskChanges):
+        if changes.reset:
+            with self._lock:
+                if self._pending is not None:
+                    self._pending.append(changes)
+                    return
+            self.load()
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(changes)
+                return
+            if not self.loaded:
+                return
+            for task_id in changes.deleted:
+                old = self._by_id.pop(task_id, None)
+                if old is not None:
+                    self._unindex(old)
+            for task in changes.inserted + changes.updated:
+                old = self._by_id.get(task.id)
+                self._by_id[task.id] = task
+                if old is None:
+                    self._index(task)
+                else:
+                    self._reindex(old, task)
+
+    def _position(self, tasks: List[Task], task: Task, sort_key) -> int:
+        row = bisect_tasks(tasks, sort_key(task), sort_key)
+        # ключ включает id, так что найденная позиция указывает ровно на задачу
+        return row if row < len(tasks) and tasks[row].id == task.id else -1
+
+    def _index(self, task: Task):
+        for sort_by, sort_key in SORT_KEYS.items():
+            tasks = self._indexes[(bool(task.completed), sort_by)]
+            tasks.insert(bisect_tasks(tasks, sort_key(task), sort_key), task)
+
+    def _unindex(self, task: Task):
+        for sort_by, sort_key in SORT_KEYS.items():
+            tasks = self._indexes[(bool(task.completed), sort_by)]
+            row = self._position(tasks, task, sort_key)
+            if row >= 0:
+                del tasks[row]
+
+    def _reindex(self, old: Task, task: Task):
+        if bool(old.completed) != bool(task.completed):
+            self._unindex(old)
+            self._index(task)
+            return
+        for sort_by, sort_key in SORT_KEYS.items():
+            tasks = self._indexes[(bool(task.completed), sort_by)]
+            row = self._position(tasks, old, sort_key)
+            if row >= 0 and sort_key(old) == sort_key(task):
+                tasks[row] = task  # порядок не изменился — замена на месте
+                continue
+            if row >= 0:
+                del tasks[row]
+            tasks.insert(bisect_tasks(tasks, sort_key(task), sort_key), task)
\ No newline at end of file
@@ -1,136 +1,597 @@
 # services/task_service.py
-from database import get_connection
-from models import Task
-from typing import List, Optional
-from datetime import datetime
+from database import get_connection, transaction, has_text_search
+from instrumentation import timed
+from models import Task, TaskChanges, Recurrence, DEFAULT_PRIORITY, PRIORITY_NAMES, content_hash, priority_rank, to_epoch
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import re
+import string
+import time
 
-PRIORITY_ORDER = {'high': 0, 'normal': 1, 'low': 2}
+# COLLATE NOCASE в SQLite приводит к нижнему регистру только ASCII
+_NOCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
 
+# ключи сортировки в Python, совпадающие с ORDER BY в запросах ниже
+SORT_KEYS = {
+    'priority': lambda t: (t.completed, t.priority, t.created_at, t.id),
+    'name': lambda t: (t.completed, t.text.translate(_NOCASE), t.created_at, t.id),
+    'date': lambda t: (t.completed, t.created_at, t.id),
+}
 
-def add_task(text: str, alarm_time: str = None) -> int:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO tasks (text, completed, priority, created_at, alarm_time) VALUES (?, ?, ?, ?, ?)",
-        (text, False, 'normal', datetime.now().isoformat(), alarm_time)
-    )
-    task_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return task_id
+# колонки ORDER BY для каждого вида сортировки (порядок как в SORT_KEYS);
+# под каждый есть индекс, поэтому сортировка идёт без временного B-дерева
+SORT_COLUMNS = {
+    'priority': ("completed", "priority", "created_at", "id"),
+    'name': ("completed", "text COLLATE NOCASE", "created_at", "id"),
+    'date': ("completed", "created_at", "id"),
+}
+
+# колонки Task.from_row; t — псевдоним tasks во всех выборках
+TASK_COLUMNS = "t.id, t.text, t.completed, t.priority, t.created_at, t.alarm_time"
+
+_listeners: List[Callable[[TaskChanges], None]] = []
+
+
+def add_change_listener(listener: Callable[[TaskChanges], None]):
+    # слушатель вызывается после коммита в том потоке, который изменил данные
+    _listeners.append(listener)
+
+
+def remove_change_listener(listener: Callable[[TaskChanges], None]):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+@timed
+def notify_changes(changes: TaskChanges):
+    for listener in list(_listeners):
+        listener(changes)
+
+
+def fetch_tasks(task_ids) -> List[Task]:
+    task_ids = list(task_ids)
+    tasks = []
+    cursor = get_connection().cursor()
+    for i in range(0, len(task_ids), 500):
+        chunk = task_ids[i:i + 500]
+        cursor.execute(
+            f"SELECT {TASK_COLUMNS} FROM tasks t WHERE t.id IN ({','.join('?' * len(chunk))})",
+            chunk
+        )
+        tasks.extend(Task.from_row(row) for row in cursor.fetchall())
+    return tasks
 
 
+def _notify_inserted(*task_ids):
+    # строки перечитываем, только если кто-то подписан
+    if _listeners:
+        notify_changes(TaskChanges(inserted=fetch_tasks(task_ids)))
+
+
+def _notify_updated(*task_ids):
+    if _listeners:
+        notify_changes(TaskChanges(updated=fetch_tasks(task_ids)))
+
+
+def _notify_deleted(*task_ids):
+    if _listeners and task_ids:
+        notify_changes(TaskChanges(deleted=list(task_ids)))
+
+
+# content_hash (параметры: хэш, хэш), если его ещё нет у другой задачи, иначе
+# NULL: уникальный индекс нужен импорту, а одинаковые задачи в списке допустимы
+FREE_HASH_SQL = "CASE WHEN EXISTS (SELECT 1 FROM tasks WHERE content_hash = ?) THEN NULL ELSE ? END"
+
+# поля, от которых считается content_hash
+HASHED_FIELDS = ('text', 'alarm_time')
+
+
+def _refresh_content_hashes(conn, task_ids):
+    # Хэш считается от текста и будильника (models.content_hash), поэтому
+    # после их правки пересчитывается — иначе задача после экспорта и
+    # импорта не узнала бы себя. Старые хэши сначала снимаются: задачи
+    # пачки могли обменяться содержимым.
+    rows = []
+    for chunk in _chunks(list(task_ids)):
+        placeholders = ','.join('?' * len(chunk))
+        rows.extend(conn.execute(
+            f"SELECT id, text, created_at, alarm_time FROM tasks WHERE id IN ({placeholders})", chunk).fetchall())
+        conn.execute(f"UPDATE tasks SET content_hash = NULL WHERE id IN ({placeholders})", chunk)
+    params = []
+    for task_id, text, created_at, alarm_time in rows:
+        digest = content_hash(text, created_at, alarm_time)
+        params.append((digest, digest, task_id))
+    conn.executemany(f"UPDATE tasks SET content_hash = {FREE_HASH_SQL} WHERE id = ?", params)
+
+
+@timed
+def add_task(text: str, alarm_time=None, priority=None) -> int:
+    # alarm_time — секунды epoch, datetime или ISO-строка; priority — имя или ранг
+    created_at, alarm_time = time.time(), to_epoch(alarm_time)
+    rank = DEFAULT_PRIORITY if priority is None else priority_rank(priority)
+    digest = content_hash(text, created_at, alarm_time)
+    with transaction() as conn:
+        # одинаковая задача, добавленная в тот же момент, остаётся без хэша
+        cursor = conn.execute(
+            "INSERT INTO tasks (text, completed, priority, created_at, alarm_time, content_hash) "
+            f"VALUES (?, ?, ?, ?, ?, {FREE_HASH_SQL})",
+            (text, 0, rank, created_at, alarm_time, digest, digest)
+        )
+    _notify_inserted(cursor.lastrowid)
+    return cursor.lastrowid
+
+
+@timed
 def delete_task(task_id: int):
-    conn = get_connection()
-    conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+    _notify_deleted(task_id)
 
 
+@timed
 def clear_completed():
-    conn = get_connection()
-    conn.execute("DELETE FROM tasks WHERE completed = 1")
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        deleted = [row[0] for row in conn.execute("SELECT id FROM tasks WHERE completed = 1")] if _listeners else []
+        conn.execute("DELETE FROM tasks WHERE completed = 1")
+    _notify_deleted(*deleted)
 
 
+@timed
 def toggle_completed(task_id: int, completed: bool):
-    conn = get_connection()
-    conn.execute("UPDATE tasks SET completed = ? WHERE id = ?", (int(completed), task_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("UPDATE tasks SET completed = ? WHERE id = ?", (int(completed), task_id))
+    _notify_updated(task_id)
 
 
+@timed
 def update_task_text(task_id: int, text: str):
-    conn = get_connection()
-    conn.execute("UPDATE tasks SET text = ? WHERE id = ?", (text, task_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("UPDATE tasks SET text = ? WHERE id = ?", (text, task_id))
+        _refresh_content_hashes(conn, [task_id])
+    _notify_updated(task_id)
 
 
-def update_task_priority(task_id: int, priority: str):
-    if priority not in ('low', 'normal', 'high'):
-        raise ValueError("Invalid priority")
-    conn = get_connection()
-    conn.execute("UPDATE tasks SET priority = ? WHERE id = ?", (priority, task_id))
-    conn.commit()
-    conn.close()
+@timed
+def update_task_priority(task_id: int, priority):
+    # priority — имя ('high'/'normal'/'low') или ранг
+    rank = priority_rank(priority)
+    with transaction() as conn:
+        conn.execute("UPDATE tasks SET priority = ? WHERE id = ?", (rank, task_id))
+    _notify_updated(task_id)
 
 
-def set_alarm(task_id: int, alarm_time: str):
-    conn = get_connection()
-    conn.execute("UPDATE tasks SET alarm_time = ? WHERE id = ?", (alarm_time, task_id))
-    conn.commit()
-    conn.close()
+# поля, которые можно менять пакетно через update_tasks; правило повторения
+# будильника при смене alarm_time сохраняется — шаг отсчитывается от нового времени
+UPDATABLE_FIELDS = ('text', 'completed', 'priority', 'alarm_time')
+
+
+def encode_update(field: str, value):
+    # значение в том виде, в каком оно хранится в базе и в Task
+    if field not in UPDATABLE_FIELDS:
+        raise ValueError(f"Invalid field: {field}")
+    if field == 'completed':
+        return int(bool(value))
+    if field == 'priority':
+        return priority_rank(value)
+    if field == 'alarm_time':
+        return to_epoch(value)
+    return value
+
+
+@timed
+def update_tasks(updates: Iterable[Tuple[int, str, object]]):
+    # пакет правок (task_id, поле, значение) одной транзакцией, по executemany на поле
+    by_field: Dict[str, list] = {}
+    task_ids = []
+    for task_id, field, value in updates:
+        value = encode_update(field, value)
+        by_field.setdefault(field, []).append((value, task_id))
+        task_ids.append(task_id)
+    if not task_ids:
+        return
+    with transaction() as conn:
+        for field, params in by_field.items():
+            conn.executemany(f"UPDATE tasks SET {field} = ? WHERE id = ?", params)
+        _refresh_content_hashes(conn, dict.fromkeys(
+            task_id for field in HASHED_FIELDS for _, task_id in by_field.get(field, ())))
+    _notify_updated(*dict.fromkeys(task_ids))
+
+
+# колонки правила повторения, в порядке Recurrence.columns()
+REPEAT_COLUMNS = ('repeat_unit', 'repeat_every', 'repeat_until', 'repeat_count')
 
 
+def _alarm_columns(alarm_time, recurrence: Optional[Recurrence]) -> Dict[str, object]:
+    # значения alarm_time и repeat_*; без будильника нет и повторения
+    alarm_time = to_epoch(alarm_time)
+    rule = recurrence.columns() if recurrence is not None and alarm_time is not None else (None,) * len(REPEAT_COLUMNS)
+    return dict(zip(('alarm_time',) + REPEAT_COLUMNS, (alarm_time,) + rule))
+
+
+@timed
+def set_alarm(task_id: int, alarm_time, recurrence: Optional[Recurrence] = None):
+    # alarm_time — секунды epoch, datetime или ISO-строка, первое срабатывание;
+    # recurrence None — будильник одноразовый
+    values = _alarm_columns(alarm_time, recurrence)
+    with transaction() as conn:
+        conn.execute(f"UPDATE tasks SET {', '.join(f'{column} = ?' for column in values)} WHERE id = ?",
+                     list(values.values()) + [task_id])
+        _refresh_content_hashes(conn, [task_id])
+    _notify_updated(task_id)
+
+
+@timed
 def remove_alarm(task_id: int):
+    set_alarm(task_id, None)
+
+
+def get_recurrence(task_id: int) -> Optional[Recurrence]:
+    row = get_connection().execute(
+        f"SELECT {', '.join(REPEAT_COLUMNS)} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+    return None if row is None else Recurrence.from_columns(*row)
+
+
+@timed
+def advance_alarms(task_ids: Iterable[int], now: Optional[float] = None) -> int:
+    # Сработавшие будильники (AlarmManager) одной транзакцией: повторяющиеся
+    # переносятся на следующее срабатывание, одноразовые и закончившиеся
+    # серии снимаются. Будильник, который тем временем перенесли (или уже
+    # продвинул другой экземпляр приложения), ещё не наступил — его не трогаем.
+    # Возвращает число изменённых задач.
+    now = time.time() if now is None else now
+    task_ids = list(dict.fromkeys(task_ids))
+    advanced, cleared = [], []
+    with transaction() as conn:
+        for chunk in _chunks(task_ids):
+            rows = conn.execute(
+                f"SELECT id, alarm_time, {', '.join(REPEAT_COLUMNS)} FROM tasks "
+                f"WHERE id IN ({','.join('?' * len(chunk))}) AND completed = 0 AND alarm_time <= ?",
+                chunk + [now])
+            for task_id, alarm_time, *rule in rows:
+                recurrence = Recurrence.from_columns(*rule)
+                when, count = (None, None) if recurrence is None else recurrence.advance(alarm_time, now)
+                if when is None:
+                    cleared.append(task_id)
+                else:
+                    advanced.append((when, count, task_id))
+        conn.executemany("UPDATE tasks SET alarm_time = ?, repeat_count = ? WHERE id = ?", advanced)
+        clear = ', '.join(f"{column} = NULL" for column in ('alarm_time',) + REPEAT_COLUMNS)
+        for chunk in _chunks(cleared):
+            conn.execute(f"UPDATE tasks SET {clear} WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        changed = [task_id for _, _, task_id in advanced] + cleared
+        _refresh_content_hashes(conn, changed)
+    if changed:
+        _notify_updated(*changed)
+    return len(changed)
+
+
+def task_sort_key(sort_by: str = 'priority') -> Callable[[Task], tuple]:
+    return SORT_KEYS.get(sort_by, SORT_KEYS['priority'])
+
+
+@dataclass
+class TaskQuery:
+    # Выборка задач: заданные условия соединяются через AND. Время — секунды
+    # epoch, datetime или ISO-строка; начало диапазона включительно, конец — нет.
+    completed: Optional[bool] = None
+    priorities: Optional[Iterable] = None  # имена или ранги
+    created_from: object = None
+    created_to: object = None
+    alarm_from: object = None
+    alarm_to: object = None
+    has_alarm: Optional[bool] = None
+    text: Optional[str] = None  # каждое слово ищется как префикс, должны встретиться все
+    sort_by: Optional[str] = 'priority'  # ключ SORT_COLUMNS, 'relevance' (с text) или None — без ORDER BY
+    descending: bool = False
+    limit: Optional[int] = None
+
+
+@lru_cache(maxsize=256)
+def _compile_query(completed, priority_count, created_from, created_to, alarm_from, alarm_to,
+                   has_alarm, word_count, fts, sort_by, descending, limit) -> str:
+    # SQL зависит только от того, какие условия заданы (не от их значений),
+    # поэтому собирается один раз на вид запроса; подготовленное выражение
+    # SQLite затем берёт из кэша соединения по тому же тексту.
+    # Порядок параметров — как в _query_parameters.
+    # completed и has_alarm подставляются литералами: только так планировщик
+    # видит, что подходит частичный индекс idx_tasks_alarm.
+    source, conditions = "tasks t", []
+    if word_count:
+        if fts:
+            source = "tasks_fts JOIN tasks t ON t.id = tasks_fts.rowid"
+            conditions.append("tasks_fts MATCH ?")
+        else:
+            conditions.extend("t.text LIKE ?" for _ in range(word_count))
+    if completed is not None:
+        conditions.append(f"t.completed = {int(completed)}")
+    if priority_count:
+        conditions.append(f"t.priority IN ({', '.join('?' * priority_count)})")
+    if created_from:
+        conditions.append("t.created_at >= ?")
+    if created_to:
+        conditions.append("t.created_at < ?")
+    if has_alarm is not None:
+        conditions.append(f"t.alarm_time IS {'NOT NULL' if has_alarm else 'NULL'}")
+    if alarm_from:
+        conditions.append("t.alarm_time >= ?")
+    if alarm_to:
+        conditions.append("t.alarm_time < ?")
+
+    sql = f"SELECT {TASK_COLUMNS} FROM {source}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if sort_by == 'relevance':
+        sql += f" ORDER BY tasks_fts.rank {'DESC' if descending else 'ASC'}, t.id ASC"
+    elif sort_by is not None:
+        columns = SORT_COLUMNS[sort_by]
+        if completed is not None:
+            # колонка, зафиксированная равенством, в ORDER BY не нужна
+            columns = columns[1:]
+        direction = " DESC" if descending else " ASC"
+        sql += " ORDER BY " + ", ".join(f"t.{column}{direction}" for column in columns)
+    if limit:
+        sql += " LIMIT ?"
+    return sql
+
+
+def _query_parameters(query: TaskQuery, words, ranks, fts) -> list:
+    params = []
+    if words:
+        if fts:
+            params.append(' '.join(f'"{word}"*' for word in words))
+        else:
+            params.extend(f"%{word}%" for word in words)
+    params.extend(ranks)
+    for value in (query.created_from, query.created_to, query.alarm_from, query.alarm_to):
+        if value is not None:
+            params.append(to_epoch(value))
+    if query.limit is not None:
+        params.append(query.limit)
+    return params
+
+
+def _prepare_query(query: TaskQuery) -> Optional[Tuple[str, list]]:
+    # SQL и параметры выборки; None — условия заведомо ничему не соответствуют
+    words = re.findall(r'\w+', query.text) if query.text is not None else []
+    if query.text is not None and not words:
+        return None
+    fts = bool(words) and has_text_search()
+    sort_by = query.sort_by
+    if sort_by == 'relevance' and not fts:
+        sort_by = 'priority'  # у LIKE нет релевантности
+    elif sort_by is not None and sort_by != 'relevance' and sort_by not in SORT_COLUMNS:
+        sort_by = 'priority'
+    ranks = sorted({priority_rank(value) for value in query.priorities}) if query.priorities is not None else []
+    if query.priorities is not None and not ranks:
+        return None
+    # диапазон по alarm_time сам по себе означает, что будильник есть
+    has_alarm = query.has_alarm
+    if has_alarm is None and (query.alarm_from is not None or query.alarm_to is not None):
+        has_alarm = True
+    sql = _compile_query(
+        query.completed if query.completed is None else bool(query.completed), len(ranks),
+        query.created_from is not None, query.created_to is not None,
+        query.alarm_from is not None, query.alarm_to is not None,
+        has_alarm, len(words), fts, sort_by, bool(query.descending), query.limit is not None)
+    return sql, _query_parameters(query, words, ranks, fts)
+
+
+@timed
+def query_tasks(query: TaskQuery) -> List[Task]:
+    # одна выборка с фильтрами, сортировкой и лимитом на стороне SQLite
+    prepared = _prepare_query(query)
+    if prepared is None:
+        return []
+    rows = get_connection().execute(*prepared).fetchall()
+    return [Task.from_row(row) for row in rows]
+
+
+def iter_tasks(query: TaskQuery, batch_size: int = 1000) -> Iterator[Task]:
+    # та же выборка, что query_tasks, но строки читаются из курсора пачками:
+    # память не зависит от размера результата (вывод длинных списков в cli.py)
+    prepared = _prepare_query(query)
+    if prepared is None:
+        return
+    cursor = get_connection().execute(*prepared)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        for row in rows:
+            yield Task.from_row(row)
+
+
+@timed
+def task_stats() -> Dict[str, int]:
+    # Сводка: всего, завершённых, активных по приоритетам, с будильником и
+    # с уже прошедшим будильником. Оба запроса читают только индексы
+    # (idx_tasks_priority и частичный idx_tasks_alarm), не таблицу.
     conn = get_connection()
-    conn.execute("UPDATE tasks SET alarm_time = NULL WHERE id = ?", (task_id,))
-    conn.commit()
-    conn.close()
+    by_priority = {name: 0 for name in PRIORITY_NAMES}
+    completed = 0
+    for is_completed, rank, count in conn.execute(
+            "SELECT completed, priority, COUNT(*) FROM tasks GROUP BY completed, priority"):
+        if is_completed:
+            completed += count
+        else:
+            by_priority[PRIORITY_NAMES[rank]] += count
+    active = sum(by_priority.values())
+    alarms, overdue = conn.execute(
+        "SELECT COUNT(*), SUM(alarm_time <= ?) FROM tasks WHERE completed = 0 AND alarm_time IS NOT NULL",
+        (time.time(),)).fetchone()
+    stats = {'total': active + completed, 'completed': completed, 'active': active}
+    stats.update((f"active_{name}", count) for name, count in by_priority.items())
+    stats.update(alarms=alarms, overdue=overdue or 0)
+    return stats
 
 
+@timed
 def get_all_tasks() -> List[Task]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT id, text, completed, priority, created_at, alarm_time FROM tasks ORDER BY completed ASC, CASE priority WHEN 'high' THEN 0 WHEN 'normal' THEN 1 ELSE 2 END, created_at ASC")
-    rows = cursor.fetchall()
-    conn.close()
-    return [Task.from_row(row) for row in rows]
+    return query_tasks(TaskQuery())
 
 
+@timed
 def get_tasks_filtered(completed_filter: Optional[bool] = None) -> List[Task]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    if completed_filter is not None:
-        cursor.execute(
-            "SELECT id, text, completed, priority, created_at, alarm_time FROM tasks WHERE completed = ? ORDER BY completed ASC, CASE priority WHEN 'high' THEN 0 WHEN 'normal' THEN 1 ELSE 2 END, created_at ASC",
-            (int(completed_filter),)
-        )
-    else:
-        cursor.execute(
-            "SELECT id, text, completed, priority, created_at, alarm_time FROM tasks ORDER BY completed ASC, CASE priority WHEN 'high' THEN 0 WHEN 'normal' THEN 1 ELSE 2 END, created_at ASC")
-    rows = cursor.fetchall()
-    conn.close()
-    return [Task.from_row(row) for row in rows]
+    return query_tasks(TaskQuery(completed=completed_filter))
 
 
+@timed
 def get_tasks_sorted(sort_by: str = 'priority') -> List[Task]:
-    conn = get_connection()
-    cursor = conn.cursor()
+    return query_tasks(TaskQuery(sort_by=sort_by))
 
-    order_clause = {
-        'priority': "completed ASC, CASE priority WHEN 'high' THEN 0 WHEN 'normal' THEN 1 ELSE 2 END, created_at ASC",
-        'name': "completed ASC, text COLLATE NOCASE ASC, created_at ASC",
-        'date': "completed ASC, created_at ASC"
-    }.get(sort_by, "completed ASC, CASE priority WHEN 'high' THEN 0 WHEN 'normal' THEN 1 ELSE 2 END, created_at ASC")
 
-    cursor.execute(f"SELECT id, text, completed, priority, created_at, alarm_time FROM tasks ORDER BY {order_clause}")
-    rows = cursor.fetchall()
-    conn.close()
-    return [Task.from_row(row) for row in rows]
+@timed
+def search_tasks(query: str, completed_filter: Optional[bool] = None,
+                 sort_by: str = 'relevance', limit: int = 200) -> List[Task]:
+    # каждое слово запроса ищется как префикс (FTS5) или подстрока (LIKE без FTS5)
+    return query_tasks(TaskQuery(completed=completed_filter, text=query, sort_by=sort_by, limit=limit))
+
+
+@timed
+def get_tasks_page(completed_filter: Optional[bool] = None, sort_by: str = 'priority',
+                   after: Optional[tuple] = None, limit: int = 100) -> List[Task]:
+    # Keyset-пагинация: after — ключ сортировки последней полученной строки
+    # (task_sort_key(sort_by)(task)), None — первая страница. Вместо OFFSET
+    # выборка продолжается поиском по индексу, поэтому глубокие страницы
+    # стоят столько же, сколько первая.
+    # Сравнение кортежей (a, b, c) > (?, ?, ?) SQLite не умеет вести по индексу
+    # с выражением или COLLATE, поэтому ключ раскладывается на уровни:
+    # сначала строки с тем же префиксом ключа, затем со следующим значением
+    # более старшей колонки и т. д. — каждый запрос идёт поиском по индексу.
+    columns = SORT_COLUMNS.get(sort_by, SORT_COLUMNS['priority'])
+    select = f"SELECT {TASK_COLUMNS} FROM tasks t"
+    cursor = get_connection().cursor()
 
+    if after is None:
+        if completed_filter is None:
+            cursor.execute(f"{select} ORDER BY {', '.join(columns)} LIMIT ?", (limit,))
+        else:
+            cursor.execute(f"{select} WHERE completed = ? ORDER BY {', '.join(columns[1:])} LIMIT ?",
+                           (int(completed_filter), limit))
+        return [Task.from_row(row) for row in cursor.fetchall()]
 
+    after = tuple(int(value) if isinstance(value, bool) else value for value in after)
+    # при фильтре по completed старшая колонка фиксирована — её уровень не нужен
+    lowest_level = 0 if completed_filter is None else 1
+    tasks = []
+    for level in range(len(columns) - 2, lowest_level - 1, -1):
+        conditions = [f"{column} = ?" for column in columns[:level]]
+        params = list(after[:level])
+        if level == len(columns) - 2:
+            # хвост (created_at, id) из обычных колонок сравнивается кортежем
+            conditions.append(f"({columns[level]}, {columns[level + 1]}) > (?, ?)")
+            params.extend(after[level:level + 2])
+        else:
+            conditions.append(f"{columns[level]} > ?")
+            params.append(after[level])
+        if completed_filter is not None and level == 0:
+            conditions.append("completed = ?")
+            params.append(int(completed_filter))
+        params.append(limit - len(tasks))
+        # колонки, зафиксированные равенством, в ORDER BY не нужны — иначе
+        # SQLite досортировывает выражение во временном B-дереве
+        order = ", ".join(columns[max(level, lowest_level):])
+        cursor.execute(f"{select} WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT ?", params)
+        tasks.extend(Task.from_row(row) for row in cursor.fetchall())
+        if len(tasks) >= limit:
+            break
+    return tasks
+
+
+@timed
 def get_tasks_with_alarms() -> List[Task]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT id, text, completed, priority, created_at, alarm_time FROM tasks WHERE alarm_time IS NOT NULL")
-    rows = cursor.fetchall()
-    conn.close()
-    return [Task.from_row(row) for row in rows]
+    return query_tasks(TaskQuery(has_alarm=True, sort_by=None))
 
 
+@timed
+def get_pending_alarms() -> List[Task]:
+    # незавершённые задачи с будильником — читается по частичному индексу idx_tasks_alarm
+    return query_tasks(TaskQuery(completed=False, has_alarm=True, sort_by=None))
+
+
+@timed
 def get_overdue_alarms() -> List[Task]:
-    now = datetime.now().isoformat()
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT id, text, completed, priority, created_at, alarm_time FROM tasks WHERE alarm_time IS NOT NULL AND alarm_time < ? AND completed = 0",
-        (now,)
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    return [Task.from_row(row) for row in rows]
\ No newline at end of file
+    return query_tasks(TaskQuery(completed=False, alarm_to=time.time(), sort_by=None))
+
+
+def _chunks(task_ids: List[int], size: int = 500):
+    # не больше 999 параметров на запрос в старых сборках SQLite
+    for i in range(0, len(task_ids), size):
+        yield task_ids[i:i + size]
+
+
+def _target_ids(conn, target, condition: str = "", params=()) -> List[int]:
+    # id задач цели пакетной операции, для которых выполняется condition
+    # (условие на колонки tasks): target — коллекция id или TaskQuery
+    if isinstance(target, TaskQuery):
+        prepared = _prepare_query(target)
+        if prepared is None:
+            return []
+        sql, query_params = prepared
+        # условие проверяется по самой таблице: в выборке только колонки Task
+        where = f" AND {condition}" if condition else ""
+        return [row[0] for row in conn.execute(
+            f"SELECT id FROM tasks WHERE id IN (SELECT id FROM ({sql})){where}", query_params + list(params))]
+    task_ids = []
+    for chunk in _chunks(list(dict.fromkeys(target))):
+        sql = f"SELECT id FROM tasks WHERE id IN ({','.join('?' * len(chunk))})"
+        if condition:
+            sql += f" AND {condition}"
+        task_ids.extend(row[0] for row in conn.execute(sql, chunk + list(params)))
+    return task_ids
+
+
+def _bulk_update(target, values: Dict[str, object]) -> int:
+    # values — колонка -> значение в виде для базы; задачи, у которых все
+    # колонки уже такие, не трогаются и не считаются
+    params = list(values.values())
+    unchanged = " AND ".join(f"{column} IS ?" for column in values)
+    assignments = ", ".join(f"{column} = ?" for column in values)
+    with transaction() as conn:
+        task_ids = _target_ids(conn, target, f"NOT ({unchanged})", params)
+        for chunk in _chunks(task_ids):
+            conn.execute(f"UPDATE tasks SET {assignments} WHERE id IN ({','.join('?' * len(chunk))})", params + chunk)
+        if any(field in values for field in HASHED_FIELDS):
+            _refresh_content_hashes(conn, task_ids)
+    if task_ids:
+        _notify_updated(*task_ids)
+    return len(task_ids)
+
+
+# Пакетные операции: target — коллекция id или TaskQuery (условия выборки,
+# сортировка и limit учитываются). Одна транзакция и одно уведомление на
+# вызов; возвращается число задач, которые действительно изменились.
+TaskTarget = Union[Iterable[int], TaskQuery]
+
+
+@timed
+def delete_tasks(target: TaskTarget) -> int:
+    with transaction() as conn:
+        task_ids = _target_ids(conn, target)
+        for chunk in _chunks(task_ids):
+            conn.execute(f"DELETE FROM tasks WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+    _notify_deleted(*task_ids)
+    return len(task_ids)
+
+
+@timed
+def set_completed(target: TaskTarget, completed: bool = True) -> int:
+    return _bulk_update(target, {'completed': encode_update('completed', completed)})
+
+
+@timed
+def set_priority(target: TaskTarget, priority) -> int:
+    # priority — имя ('high'/'normal'/'low') или ранг
+    return _bulk_update(target, {'priority': encode_update('priority', priority)})
+
+
+@timed
+def set_alarms(target: TaskTarget, alarm_time, recurrence: Optional[Recurrence] = None) -> int:
+    # alarm_time — секунды epoch, datetime или ISO-строка; recurrence — как в set_alarm
+    return _bulk_update(target, _alarm_columns(alarm_time, recurrence))
+
+
+@timed
+def clear_alarms(target: TaskTarget) -> int:
+    return _bulk_update(target, _alarm_columns(None, None))
\ No newline at end of file
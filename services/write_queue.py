@@ -0,0 +1,104 @@
+# services/write_queue.py
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from models import TaskChanges
+from services.task_service import update_tasks, encode_update, notify_changes
+
+
+class WriteQueue:
+    # Правки из интерфейса (флажок, текст, приоритет, будильник) не пишутся
+    # в базу в GUI-потоке: они складываются в очередь, а отдельный поток раз
+    # в FLUSH_INTERVAL записывает накопленное одной транзакцией. Повторные
+    # правки одного поля одной задачи схлопываются — пишется последнее значение.
+    FLUSH_INTERVAL = 0.1  # секунд
+    # паузы перед повторами пачки, которую не удалось записать (например,
+    # база занята другим процессом); после последнего пачка отбрасывается
+    RETRY_DELAYS = (0.1, 0.5, 2.0)  # секунд
+
+    def __init__(self, flush_interval: Optional[float] = None):
+        self.flush_interval = self.FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._cond = threading.Condition()
+        self._pending: Dict[Tuple[int, str], object] = {}  # (task_id, поле) -> значение
+        self._queued = 0  # номер последней поставленной правки
+        self._written = 0  # номер последней записанной (или отброшенной с ошибкой)
+        self._lost = 0  # отброшено правок с прошлого flush
+        self._flush_requested = False
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="task-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def enqueue(self, task_id: int, field: str, value):
+        # проверяем сразу, чтобы одна неверная правка не сорвала запись всей пачки
+        value = encode_update(field, value)
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("Write queue is stopped")
+            self._pending[(task_id, field)] = value
+            self._queued += 1
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        # ждёт записи всего, что было поставлено до вызова; False — истёк
+        # timeout или с прошлого flush часть правок так и не удалось записать
+        with self._cond:
+            target = self._queued
+            if self._written < target:
+                self._flush_requested = True
+                self._cond.notify_all()
+                if not self._cond.wait_for(lambda: self._written >= target, timeout):
+                    return False
+            lost, self._lost = self._lost, 0
+            return not lost
+
+    def stop(self, timeout: Optional[float] = None):
+        # записывает остаток очереди и останавливает поток
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self):
+        attempt = 0
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # даём правкам накопиться, если сброс не запросили явно
+                deadline = time.monotonic() + self.flush_interval
+                while not (self._flush_requested or self._stopping):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, {}
+                written = self._queued
+                self._flush_requested = False
+            try:
+                update_tasks((task_id, field, value) for (task_id, field), value in batch.items())
+            except Exception as e:
+                print(f"Ошибка записи изменений: {e}")
+                with self._cond:
+                    if attempt < len(self.RETRY_DELAYS):
+                        # пачка возвращается в очередь под более новые правки тех же полей
+                        for key, value in batch.items():
+                            self._pending.setdefault(key, value)
+                        self._cond.wait_for(lambda: self._stopping, self.RETRY_DELAYS[attempt])
+                        attempt += 1
+                        continue
+                    self._lost += len(batch)
+                # интерфейс уже показывает отброшенные правки — пусть перечитает базу
+                notify_changes(TaskChanges(reset=True))
+            attempt = 0
+            with self._cond:
+                self._written = written
+                self._cond.notify_all()
\ No newline at end of file
@@ -0,0 +1,74 @@
+# ui/archive_dialog.py
+# Открывается только из меню «Файл → Архив...»: модуль и archive_service
+# импортируются при первом открытии, а не при запуске.
+from PyQt6.QtWidgets import (
+    QAbstractItemView, QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+    QLineEdit, QListWidget, QListWidgetItem, QPushButton
+)
+from PyQt6.QtCore import Qt, QTimer
+from services.archive_service import archived_count, restore_tasks, search_archive
+
+
+class ArchiveDialog(QDialog):
+    # поиск по архиву завершённых задач и возврат выбранных в список
+    SEARCH_DEBOUNCE_MS = 250
+    SEARCH_LIMIT = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Архив")
+        self.resize(500, 400)
+        layout = QVBoxLayout(self)
+
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Поиск в архиве...")
+        self.search.setClearButtonEnabled(True)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.refresh)
+        self.search.textChanged.connect(self.search_timer.start)
+
+        self.task_list = QListWidget()
+        self.task_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.count_label = QLabel()
+
+        btn_layout = QHBoxLayout()
+        restore_btn = QPushButton("Восстановить")
+        close_btn = QPushButton("Закрыть")
+        btn_layout.addWidget(self.count_label)
+        btn_layout.addStretch()
+        btn_layout.addWidget(restore_btn)
+        btn_layout.addWidget(close_btn)
+
+        layout.addWidget(self.search)
+        layout.addWidget(self.task_list)
+        layout.addLayout(btn_layout)
+
+        restore_btn.clicked.connect(self.restore_selected)
+        close_btn.clicked.connect(self.accept)
+        self.refresh()
+
+    def refresh(self):
+        try:
+            tasks = search_archive(self.search.text(), self.SEARCH_LIMIT)
+            count = archived_count()
+        except Exception as e:
+            print(f"Ошибка при поиске в архиве: {e}")
+            return
+        self.task_list.clear()
+        for task in tasks:
+            item = QListWidgetItem(task.text)
+            item.setData(Qt.ItemDataRole.UserRole, task.id)
+            self.task_list.addItem(item)
+        self.count_label.setText(f"В архиве: {count}")
+
+    def restore_selected(self):
+        task_ids = [item.data(Qt.ItemDataRole.UserRole) for item in self.task_list.selectedItems()]
+        if not task_ids:
+            return
+        try:
+            restore_tasks(task_ids)
+        except Exception as e:
+            print(f"Ошибка при восстановлении задач: {e}")
+        self.refresh()
\ No newline at end of file
@@ -1,81 +1,74 @@
 # ui/components.py
+from typing import Optional
 from PyQt6.QtWidgets import (
-    QWidget, QHBoxLayout, QCheckBox, QLineEdit, QComboBox, QLabel,
-    QPushButton, QDateTimeEdit
+    QApplication, QComboBox, QDialog, QFormLayout, QVBoxLayout, QHBoxLayout,
+    QLineEdit, QMenu, QPushButton, QDateTimeEdit, QSpinBox,
+    QStyle, QStyledItemDelegate, QStyleOptionButton, QStyleOptionComboBox
 )
-from PyQt6.QtCore import Qt, QDateTime
-from PyQt6.QtGui import QFont
-from services.task_service import (
-    toggle_completed, update_task_text, update_task_priority, set_alarm
-)
-
-class TaskItemWidget(QWidget):
-    def __init__(self, task):
-        super().__init__()
-        self.task = task
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-
-        self.checkbox = QCheckBox()
-        self.checkbox.setChecked(task.completed)
-        self.checkbox.stateChanged.connect(self.on_toggle)
-
-        self.text_edit = QLineEdit(task.text)
-        self.text_edit.editingFinished.connect(self.on_text_edit)
-
-        self.priority_combo = QComboBox()
-        self.priority_combo.addItems(["high", "normal", "low"])
-        self.priority_combo.setCurrentText(task.priority)
-        self.priority_combo.currentTextChanged.connect(self.on_priority_change)
-
-        self.alarm_button = QPushButton("Будильник")
-        self.alarm_button.clicked.connect(self.set_alarm_time)
-
-        layout.addWidget(self.checkbox)
-        layout.addWidget(self.text_edit, 1)
-        layout.addWidget(self.priority_combo)
-        layout.addWidget(self.alarm_button)
-
-        if task.completed:
-            self.apply_completed_style()
-
-        if task.alarm_time:
-            self.alarm_button.setText("⏰")
-
-    def apply_completed_style(self):
-        font = QFont()
-        font.setStrikeOut(True)
-        self.text_edit.setFont(font)
-        self.text_edit.setStyleSheet("color: gray;")
-
-    def on_toggle(self, state):
-        completed = state == Qt.CheckState.Checked.value
-        toggle_completed(self.task.id, completed)
-        if completed:
-            self.apply_completed_style()
+from PyQt6.QtCore import Qt, QDateTime, QEvent, QModelIndex, QPersistentModelIndex, QRect, QSize
+from PyQt6.QtGui import QFont, QColor
+from models import PRIORITY_NAMES, Recurrence
+from services.task_service import get_recurrence
+from ui.task_model import TaskListModel
+
+PRIORITIES = list(PRIORITY_NAMES)
+
+
+class AlarmDialog(QDialog):
+    # пункты «Повтор» -> Recurrence.unit; «каждые N» задаёт произвольный интервал
+    REPEATS = (("Не повторять", None), ("Каждый день", 'day'), ("Каждую неделю", 'week'), ("Каждый месяц", 'month'))
+    ENDS = ("Без окончания", "До даты", "Количество раз")
+
+    def __init__(self, parent=None, alarm_time=None, recurrence: Recurrence = None):
+        # alarm_time и recurrence — текущий будильник задачи, если есть
+        super().__init__(parent)
+        self.setWindowTitle("Установить будильник")
+        layout = QVBoxLayout(self)
+
+        self.date_time_edit = QDateTimeEdit()
+        self.date_time_edit.setCalendarPopup(True)
+        if alarm_time:
+            self.date_time_edit.setDateTime(QDateTime.fromMSecsSinceEpoch(int(alarm_time * 1000)))
         else:
-            self.text_edit.setFont(QFont())
-            self.text_edit.setStyleSheet("")
-
-    def on_text_edit(self):
-        new_text = self.text_edit.text().strip()
-        if new_text:
-            update_task_text(self.task.id, new_text)
-
-    def on_priority_change(self, priority):
-        update_task_priority(self.task.id, priority)
-
-    def set_alarm_time(self):
-        from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPushButton
-        dialog = QDialog()
-        dialog.setWindowTitle("Установить будильник")
-        layout = QVBoxLayout(dialog)
-
-        date_time_edit = QDateTimeEdit()
-        date_time_edit.setCalendarPopup(True)
-        date_time_edit.setDateTime(QDateTime.currentDateTime())  # текущее время по умолчанию
-
-        layout.addWidget(date_time_edit)
+            self.date_time_edit.setDateTime(QDateTime.currentDateTime())  # текущее время по умолчанию
+
+        layout.addWidget(self.date_time_edit)
+
+        form = QFormLayout()
+        self.repeat_combo = QComboBox()
+        for label, unit in self.REPEATS:
+            self.repeat_combo.addItem(label, unit)
+        self.every_spin = QSpinBox()
+        self.every_spin.setRange(1, 999)
+        self.every_spin.setPrefix("каждые ")
+        self.end_combo = QComboBox()
+        self.end_combo.addItems(self.ENDS)
+        self.until_edit = QDateTimeEdit()
+        self.until_edit.setCalendarPopup(True)
+        self.until_edit.setDateTime(self.date_time_edit.dateTime().addMonths(1))
+        self.count_spin = QSpinBox()
+        self.count_spin.setRange(1, 9999)
+        self.count_spin.setValue(10)
+        self.count_spin.setSuffix(" раз")
+        form.addRow("Повтор:", self.repeat_combo)
+        form.addRow("Интервал:", self.every_spin)
+        form.addRow("Окончание:", self.end_combo)
+        form.addRow("", self.until_edit)
+        form.addRow("", self.count_spin)
+        layout.addLayout(form)
+
+        if recurrence is not None:
+            self.repeat_combo.setCurrentIndex(self.repeat_combo.findData(recurrence.unit))
+            self.every_spin.setValue(recurrence.every)
+            if recurrence.until is not None:
+                self.end_combo.setCurrentIndex(1)
+                self.until_edit.setDateTime(QDateTime.fromMSecsSinceEpoch(int(recurrence.until * 1000)))
+            elif recurrence.count is not None:
+                self.end_combo.setCurrentIndex(2)
+                self.count_spin.setValue(recurrence.count)
+        self.repeat_combo.currentIndexChanged.connect(self.update_repeat_controls)
+        self.end_combo.currentIndexChanged.connect(self.update_repeat_controls)
+        self.update_repeat_controls()
 
         btn_layout = QHBoxLayout()
         save_btn = QPushButton("Сохранить")
@@ -84,13 +77,146 @@ class TaskItemWidget(QWidget):
         btn_layout.addWidget(cancel_btn)
         layout.addLayout(btn_layout)
 
-        def save_alarm():
-            alarm_time = date_time_edit.dateTime().toPyDateTime().isoformat()
-            set_alarm(self.task.id, alarm_time)
-            self.alarm_button.setText("⏰")
-            dialog.accept()
-
-        save_btn.clicked.connect(save_alarm)
-        cancel_btn.clicked.connect(dialog.reject)
-
-        dialog.exec()
\ No newline at end of file
+        save_btn.clicked.connect(self.accept)
+        cancel_btn.clicked.connect(self.reject)
+
+    def update_repeat_controls(self):
+        repeats = self.repeat_combo.currentData() is not None
+        end = self.end_combo.currentIndex()
+        self.every_spin.setEnabled(repeats)
+        self.end_combo.setEnabled(repeats)
+        self.until_edit.setVisible(repeats and end == 1)
+        self.count_spin.setVisible(repeats and end == 2)
+
+    def alarm_time(self) -> float:
+        return self.date_time_edit.dateTime().toMSecsSinceEpoch() / 1000
+
+    def recurrence(self) -> Optional[Recurrence]:
+        unit = self.repeat_combo.currentData()
+        if unit is None:
+            return None
+        end = self.end_combo.currentIndex()
+        until = self.until_edit.dateTime().toMSecsSinceEpoch() / 1000 if end == 1 else None
+        count = self.count_spin.value() if end == 2 else None
+        return Recurrence(unit, self.every_spin.value(), until, count)
+
+
+class TaskItemDelegate(QStyledItemDelegate):
+    # Рисует строку задачи: флажок, текст, приоритет, кнопка будильника.
+    # Настоящие виджеты не создаются: редактор текста появляется только
+    # при редактировании, остальное обрабатывается в editorEvent.
+    ROW_HEIGHT = 30
+    SPACING = 6
+    CHECK_WIDTH = 20
+    PRIORITY_WIDTH = 80
+    ALARM_WIDTH = 90
+
+    def _rects(self, rect):
+        r = rect.adjusted(self.SPACING // 2, 2, -self.SPACING // 2, -2)
+        check = QRect(r.left(), r.top(), self.CHECK_WIDTH, r.height())
+        alarm = QRect(r.right() - self.ALARM_WIDTH + 1, r.top(), self.ALARM_WIDTH, r.height())
+        priority = QRect(alarm.left() - self.SPACING - self.PRIORITY_WIDTH, r.top(),
+                         self.PRIORITY_WIDTH, r.height())
+        text_left = check.right() + self.SPACING
+        text = QRect(text_left, r.top(), priority.left() - self.SPACING - text_left, r.height())
+        return check, text, priority, alarm
+
+    def paint(self, painter, option, index):
+        task = index.data(TaskListModel.TaskRole)
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
+        check_rect, text_rect, priority_rect, alarm_rect = self._rects(option.rect)
+
+        painter.save()
+        style.drawPrimitive(QStyle.PrimitiveElement.PE_PanelItemViewItem, option, painter, widget)
+
+        check = QStyleOptionButton()
+        size = style.pixelMetric(QStyle.PixelMetric.PM_IndicatorWidth, None, widget)
+        check.rect = QRect(check_rect.left(), check_rect.center().y() - size // 2, size, size)
+        check.state = QStyle.StateFlag.State_Enabled | (
+            QStyle.StateFlag.State_On if task.completed else QStyle.StateFlag.State_Off)
+        style.drawPrimitive(QStyle.PrimitiveElement.PE_IndicatorCheckBox, check, painter, widget)
+
+        font = QFont(option.font)
+        if task.completed:
+            font.setStrikeOut(True)
+            painter.setPen(QColor("gray"))
+        elif option.state & QStyle.StateFlag.State_Selected:
+            painter.setPen(option.palette.highlightedText().color())
+        else:
+            painter.setPen(option.palette.text().color())
+        painter.setFont(font)
+        text = painter.fontMetrics().elidedText(task.text, Qt.TextElideMode.ElideRight, text_rect.width())
+        painter.drawText(text_rect, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, text)
+        painter.setFont(option.font)
+
+        combo = QStyleOptionComboBox()
+        combo.rect = priority_rect
+        combo.currentText = task.priority_name
+        combo.state = QStyle.StateFlag.State_Enabled
+        combo.palette = option.palette
+        style.drawComplexControl(QStyle.ComplexControl.CC_ComboBox, combo, painter, widget)
+        style.drawControl(QStyle.ControlElement.CE_ComboBoxLabel, combo, painter, widget)
+
+        button = QStyleOptionButton()
+        button.rect = alarm_rect
+        button.text = "⏰" if task.alarm_time else "Будильник"
+        button.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+        button.palette = option.palette
+        style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, widget)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() != QEvent.Type.MouseButtonRelease or event.button() != Qt.MouseButton.LeftButton:
+            return super().editorEvent(event, model, option, index)
+        pos = event.position().toPoint()
+        check_rect, _, priority_rect, alarm_rect = self._rects(option.rect)
+        task = index.data(TaskListModel.TaskRole)
+        widget = option.widget
+
+        if check_rect.contains(pos):
+            state = Qt.CheckState.Unchecked if task.completed else Qt.CheckState.Checked
+            model.setData(index, state, Qt.ItemDataRole.CheckStateRole)
+            return True
+        # меню и диалог крутят вложенный цикл событий: пока они открыты,
+        # уведомления могут вставить или переместить строки, поэтому index
+        # после exec() уже не годится
+        if priority_rect.contains(pos):
+            row = QPersistentModelIndex(index)
+            menu = QMenu(widget)
+            for priority in PRIORITIES:
+                action = menu.addAction(priority)
+                action.setCheckable(True)
+                action.setChecked(priority == task.priority_name)
+            chosen = menu.exec(widget.mapToGlobal(priority_rect.bottomLeft()))
+            current = QModelIndex(row)
+            if (chosen and chosen.text() != task.priority_name and current.isValid()
+                    and current.data(TaskListModel.TaskRole).id == task.id):
+                model.setData(current, chosen.text(), TaskListModel.PriorityRole)
+            return True
+        if alarm_rect.contains(pos):
+            try:
+                recurrence = get_recurrence(task.id) if task.alarm_time else None
+            except Exception as e:
+                print(f"Ошибка при чтении повторения будильника: {e}")
+                recurrence = None
+            dialog = AlarmDialog(widget, task.alarm_time, recurrence)
+            if dialog.exec():
+                model.set_task_alarm(task.id, dialog.alarm_time(), dialog.recurrence())
+            return True
+        return super().editorEvent(event, model, option, index)
+
+    def createEditor(self, parent, option, index):
+        return QLineEdit(parent)
+
+    def setEditorData(self, editor, index):
+        editor.setText(index.data(Qt.ItemDataRole.EditRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.text(), Qt.ItemDataRole.EditRole)
+
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(self._rects(option.rect)[1])
\ No newline at end of file
@@ -1,24 +1,37 @@
 # ui/main_window.py
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QStackedWidget,
-    QListWidget, QListWidgetItem, QLabel, QLineEdit, QPushButton,
-    QComboBox
+    QListView, QAbstractItemView, QLabel, QLineEdit, QPushButton,
+    QComboBox, QMenu, QMessageBox
 )
-from PyQt6.QtCore import Qt, QPoint
-from PyQt6.QtGui import QFont, QAction
+from PyQt6.QtCore import Qt, QPoint, QTimer, pyqtSignal
+from PyQt6.QtGui import QAction
 from services.task_service import (
-    add_task as svc_add_task,
-    delete_task, toggle_completed, update_task_text,
-    update_task_priority, get_tasks_filtered, get_tasks_sorted, clear_completed
+    add_task as svc_add_task, clear_completed,
+    add_change_listener, remove_change_listener, search_tasks, get_tasks_page,
+    delete_tasks, set_completed, set_priority, set_alarms, clear_alarms
 )
-from services.import_service import import_from_json
-from ui.components import TaskItemWidget
+from services.change_feed import ChangeFeed
+from services.task_repository import TaskRepository
+from services.write_queue import WriteQueue
+from ui.components import PRIORITIES, AlarmDialog, TaskItemDelegate
+from ui.task_model import TaskListModel
+from ui.workers import StartupWorker, QueryRunner
 from alarm_manager import AlarmManager
-from plyer import notification
-import sys
+from notifications import NotificationDispatcher
+from instrumentation import phase, mark_startup
+import threading
 
 
 class MainWindow(QMainWindow):
+    # окно показывается до обращения к базе; список готов к работе после loaded
+    interactive = pyqtSignal()
+
+    # обслуживание базы (архив, vacuum, статистика): первое — через пару минут
+    # после запуска, чтобы не мешать старту, дальше — раз в несколько часов
+    MAINTENANCE_DELAY_MS = 2 * 60 * 1000
+    MAINTENANCE_INTERVAL_MS = 6 * 60 * 60 * 1000
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("ToDo App")
@@ -46,19 +59,59 @@ class MainWindow(QMainWindow):
         # Меню сверху (для импорта и сортировки)
         self.create_menu_bar()
 
-        # Запуск AlarmManager
+        # AlarmManager запускается, когда база готова (on_startup_loaded)
         self.alarm_manager = AlarmManager()
-        self.alarm_manager.alarm_triggered.connect(self.show_notification)
+        self.notifier = NotificationDispatcher()
+        self.alarm_manager.alarms_triggered.connect(self.notifier.post)
+        # изменения из других процессов, тоже с on_startup_loaded
+        self.change_feed = ChangeFeed()
+
+        self.startup_worker = None
+        self.maintenance_worker = None
+        self.maintenance_timer = QTimer(self)
+        self.maintenance_timer.setInterval(self.MAINTENANCE_INTERVAL_MS)
+        self.maintenance_timer.timeout.connect(self.run_maintenance)
+        mark_startup('window_created')
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.startup_worker is None:
+            # первая отрисовка — теперь можно идти в базу, не задерживая показ окна
+            mark_startup('first_paint')
+            self.startup_worker = StartupWorker(self.list_view.load_first_page, self)
+            self.startup_worker.loaded.connect(self.on_startup_loaded)
+            self.startup_worker.failed.connect(
+                lambda message: QMessageBox.critical(self, "Ошибка запуска", message))
+            self.startup_worker.start()
+
+    def on_startup_loaded(self, first_page, overdue_count):
+        self.list_view.start(first_page)
+        self.notifier.start()
         self.alarm_manager.start()
+        self.change_feed.start()
+        QTimer.singleShot(self.MAINTENANCE_DELAY_MS, self.run_maintenance)
+        self.maintenance_timer.start()
+        mark_startup('interactive')
+        self.interactive.emit()
 
     def create_menu_bar(self):
         menubar = self.menuBar()
 
         # Меню "Файл"
         file_menu = menubar.addMenu("Файл")
-        import_action = QAction("Импортировать из JSON...", self)
-        import_action.triggered.connect(self.import_json)
+        import_action = QAction("Импортировать...", self)
+        import_action.triggered.connect(lambda: self.import_json('skip'))
         file_menu.addAction(import_action)
+        # задачи, которые уже есть в базе, получают отметку и приоритет из файла
+        update_action = QAction("Импортировать с обновлением...", self)
+        update_action.triggered.connect(lambda: self.import_json('update'))
+        file_menu.addAction(update_action)
+        export_action = QAction("Экспортировать...", self)
+        export_action.triggered.connect(self.export_tasks)
+        file_menu.addAction(export_action)
+        archive_action = QAction("Архив...", self)
+        archive_action.triggered.connect(self.show_archive)
+        file_menu.addAction(archive_action)
 
         # Меню "Сортировка" (в верхнем меню)
         sort_menu = menubar.addMenu("Сортировка")
@@ -74,20 +127,76 @@ class MainWindow(QMainWindow):
         sort_by_date.triggered.connect(lambda: self.list_view.set_sort("date"))
         sort_menu.addAction(sort_by_date)
 
-    def import_json(self):
-        from PyQt6.QtWidgets import QFileDialog
-        file_path, _ = QFileDialog.getOpenFileName(self, "Выберите JSON-файл", "", "JSON Files (*.json)")
-        if file_path:
-            import_from_json(file_path)
-            self.list_view.refresh_tasks()
-
-    def show_notification(self, task_id: int, task_text: str):
-        notification.notify(
-            title="Напоминание",
-            message=f"Задача: {task_text}",
-            timeout=10
-        )
-
+    def show_archive(self):
+        from ui.archive_dialog import ArchiveDialog  # нужен только здесь
+        ArchiveDialog(self).exec()
+
+    def import_json(self, mode='skip'):
+        from PyQt6.QtWidgets import QFileDialog, QProgressDialog
+        from ui.workers import ImportWorker
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Выберите файл", "", "JSON Files (*.json *.ndjson *.jsonl);;CSV Files (*.csv)")
+        if not file_path:
+            return
+
+        # импорт идёт в фоновом потоке, окно остаётся отзывчивым
+        dialog = QProgressDialog("Импорт задач...", None, 0, 100, self)
+        dialog.setWindowTitle("Импорт")
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(300)
+
+        worker = ImportWorker(file_path, mode, self)
+        worker.progress.connect(lambda done, percent: (
+            dialog.setValue(percent), dialog.setLabelText(f"Обработано задач: {done}")))
+        worker.succeeded.connect(lambda result: QMessageBox.information(
+            self, "Импорт", f"Добавлено: {result.inserted}\nОбновлено: {result.updated}\n"
+                            f"Пропущено (уже есть): {result.skipped}"))
+        worker.failed.connect(lambda message: QMessageBox.warning(self, "Ошибка импорта", message))
+        worker.finished.connect(dialog.close)
+        worker.finished.connect(worker.deleteLater)
+        self.import_worker = worker
+        worker.start()
+
+    def export_tasks(self):
+        from PyQt6.QtWidgets import QFileDialog, QProgressDialog
+        from ui.workers import ExportWorker
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Экспорт задач", "tasks.json",
+            "JSON Files (*.json);;NDJSON Files (*.ndjson *.jsonl);;CSV Files (*.csv)")
+        if not file_path:
+            return
+        # отложенные правки из списка должны попасть в файл
+        if not self.list_view.writer.flush():
+            print("Ошибка записи изменений: экспорт пойдёт без незаписанных правок")
+
+        # экспортируются задачи текущего фильтра списка
+        dialog = QProgressDialog("Экспорт задач...", None, 0, 100, self)
+        dialog.setWindowTitle("Экспорт")
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(300)
+
+        worker = ExportWorker(file_path, self.list_view.current_filter, self)
+        worker.progress.connect(lambda done, percent: (
+            dialog.setValue(percent), dialog.setLabelText(f"Экспортировано задач: {done}")))
+        worker.failed.connect(lambda message: QMessageBox.warning(self, "Ошибка экспорта", message))
+        worker.finished.connect(dialog.close)
+        worker.finished.connect(worker.deleteLater)
+        self.export_worker = worker
+        worker.start()
+
+    def run_maintenance(self):
+        if self.maintenance_worker is not None and self.maintenance_worker.isRunning():
+            return
+        from ui.workers import MaintenanceWorker
+        worker = MaintenanceWorker(self)
+        worker.failed.connect(lambda message: print(f"Ошибка обслуживания базы: {message}"))
+        self.maintenance_worker = worker
+        worker.start()
+
+    def stop_maintenance(self):
+        self.maintenance_timer.stop()
+        if self.maintenance_worker is not None:
+            self.maintenance_worker.wait()
 
 class Sidebar(QWidget):
     def __init__(self, parent):
@@ -139,6 +248,12 @@ class Sidebar(QWidget):
 
 
 class TaskListView(QWidget):
+    # сервис может сообщить об изменениях из любого потока — доставляем в GUI-поток
+    tasks_changed = pyqtSignal(object)
+
+    SEARCH_DEBOUNCE_MS = 250
+    SEARCH_LIMIT = 500
+
     def __init__(self):
         super().__init__()
         layout = QVBoxLayout(self)
@@ -148,7 +263,34 @@ class TaskListView(QWidget):
         self.input.setPlaceholderText("Новая задача...")
         self.input.returnPressed.connect(self.add_task)
 
-        self.task_list = QListWidget()
+        # поиск по мере ввода: запрос уходит после паузы в наборе
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Поиск...")
+        self.search.setClearButtonEnabled(True)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.refresh_tasks)
+        self.search.textChanged.connect(self.search_timer.start)
+
+        # правки в строках пишутся в базу фоновым потоком
+        self.writer = WriteQueue()
+        self.writer.start()
+
+        # виртуализированный список: модель + делегат, без виджета на строку
+        self.model = TaskListModel(self, self.writer)
+        self.task_list = QListView()
+        self.task_list.setModel(self.model)
+        self.task_list.setItemDelegate(TaskItemDelegate(self.task_list))
+        self.task_list.setUniformItemSizes(True)
+        self.task_list.setLayoutMode(QListView.LayoutMode.Batched)
+        self.task_list.setBatchSize(1000)
+        self.task_list.setEditTriggers(
+            QAbstractItemView.EditTrigger.DoubleClicked | QAbstractItemView.EditTrigger.EditKeyPressed)
+        # несколько строк (Shift/Ctrl) — действия контекстного меню применяются ко всем сразу
+        self.task_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.task_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.task_list.customContextMenuRequested.connect(self.show_context_menu)
 
         btn_layout = QHBoxLayout()
         self.add_btn = QPushButton("Добавить")
@@ -162,12 +304,43 @@ class TaskListView(QWidget):
         btn_layout.addWidget(self.clear_btn)
 
         layout.addWidget(self.input)
+        layout.addWidget(self.search)
         layout.addWidget(self.task_list)
         layout.addLayout(btn_layout)
 
         self.current_filter = None  # None, True (completed), False (active)
         self.current_sort = "priority"  # по умолчанию сортировка по приоритету
-        self.refresh_tasks()
+
+        # при старте читается только первая страница; полный набор задач
+        # загружается в репозиторий в фоне и дальше обновляется по уведомлениям.
+        # До start() список не обращается к базе и недоступен для ввода.
+        self.repository = TaskRepository()
+        self.repository.attach()
+        self.setEnabled(False)
+
+        # запросы списка идут в пуле потоков; устаревшие отменяются
+        self.runner = QueryRunner(self)
+        self.runner.finished.connect(self.on_tasks_loaded)
+        self.runner.failed.connect(lambda generation, message: print(f"Ошибка при загрузке задач: {message}"))
+        self._changes_during_load = None  # изменения, пришедшие, пока идёт загрузка
+
+        self.tasks_changed.connect(self.on_tasks_changed)
+        self._change_listener = self.tasks_changed.emit  # ссылка нужна для remove_change_listener
+        add_change_listener(self._change_listener)
+
+    def load_first_page(self):
+        # может выполняться в фоновом потоке (StartupWorker)
+        return get_tasks_page(self.current_filter, self.current_sort, None, self.model.PAGE_SIZE)
+
+    def start(self, first_page=None):
+        # first_page — заранее прочитанная первая страница; без неё читается здесь
+        if first_page is None:
+            self.refresh_tasks()
+        else:
+            with phase('refresh_tasks.set_tasks'):
+                self.model.set_tasks(first_page, self.current_filter, self.current_sort, self._page_source())
+        threading.Thread(target=self.repository.load, daemon=True).start()
+        self.setEnabled(True)
 
     def set_filter(self, name):
         self.current_filter = {"Все задачи": None, "Активные": False, "Завершённые": True}.get(name)
@@ -183,47 +356,123 @@ class TaskListView(QWidget):
             try:
                 svc_add_task(text)
                 self.input.clear()
-                self.refresh_tasks()
             except Exception as e:
                 print(f"Ошибка при добавлении задачи: {e}")
 
+    def selected_ids(self):
+        # выделенные строки, а без выделения — текущая
+        rows = [index.row() for index in self.task_list.selectionModel().selectedRows()]
+        if not rows:
+            rows = [self.task_list.currentIndex().row()]
+        return [task.id for task in map(self.model.task, sorted(rows)) if task]
+
     def delete_task(self):
-        item = self.task_list.currentItem()
-        if item and hasattr(item, 'task_id'):
-            try:
-                delete_task(item.task_id)
-                self.refresh_tasks()
-            except Exception as e:
-                print(f"Ошибка при удалении задачи: {e}")
+        self.run_bulk(delete_tasks)
+
+    def run_bulk(self, operation, *args):
+        # одна транзакция на все выделенные задачи; список обновится по одному уведомлению
+        task_ids = self.selected_ids()
+        if not task_ids:
+            return
+        try:
+            self.writer.flush()  # правки этих строк, ещё не записанные в базу
+            operation(task_ids, *args)
+        except Exception as e:
+            print(f"Ошибка при изменении задач: {e}")
+
+    def show_context_menu(self, pos):
+        if not self.selected_ids():
+            return
+        menu = QMenu(self)
+        menu.addAction("Завершить", lambda: self.run_bulk(set_completed, True))
+        menu.addAction("Вернуть в работу", lambda: self.run_bulk(set_completed, False))
+        priority_menu = menu.addMenu("Приоритет")
+        for priority in PRIORITIES:
+            priority_menu.addAction(priority, lambda p=priority: self.run_bulk(set_priority, p))
+        menu.addAction("Будильник...", self.set_alarm_selected)
+        menu.addAction("Убрать будильник", lambda: self.run_bulk(clear_alarms))
+        menu.addSeparator()
+        menu.addAction("Удалить", self.delete_task)
+        menu.exec(self.task_list.viewport().mapToGlobal(pos))
+
+    def set_alarm_selected(self):
+        dialog = AlarmDialog(self)
+        if dialog.exec():
+            self.run_bulk(set_alarms, dialog.alarm_time(), dialog.recurrence())
 
     def clear_completed(self):
         try:
+            self.writer.flush()  # отметки о завершении, ещё не записанные в базу
             clear_completed()
-            self.refresh_tasks()
         except Exception as e:
             print(f"Ошибка при очистке завершённых задач: {e}")
 
     def refresh_tasks(self):
         try:
-            self.task_list.clear()
-            if self.current_filter is not None:
-                # фильтруем, но сортируем по выбранному параметру
-                tasks = get_tasks_filtered(completed_filter=self.current_filter)
-                # теперь сортируем вручную
-                if self.current_sort == 'name':
-                    tasks.sort(key=lambda t: t.text.lower())
-                elif self.current_sort == 'date':
-                    tasks.sort(key=lambda t: t.created_at)
-                # priority уже отсортировано в SQL
-            else:
-                tasks = get_tasks_sorted(self.current_sort)
-
-            for task in tasks:
-                widget = TaskItemWidget(task)
-                item = QListWidgetItem()
-                item.task_id = task.id
-                item.setSizeHint(widget.sizeHint())
-                self.task_list.addItem(item)
-                self.task_list.setItemWidget(item, widget)
+            with phase('refresh_tasks'):
+                self._refresh_tasks()
         except Exception as e:
-            print(f"Ошибка при обновлении списка задач: {e}")
\ No newline at end of file
+            print(f"Ошибка при обновлении списка задач: {e}")
+
+    def _refresh_tasks(self):
+        # запрос уходит в QueryRunner, GUI-поток не ждёт; результат — в on_tasks_loaded
+        query = self.search.text().strip()
+        completed_filter = self.current_filter
+        if query:
+            # результаты поиска упорядочены по релевантности
+            def load():
+                with phase('refresh_tasks.search'):
+                    return search_tasks(query, completed_filter, 'relevance', self.SEARCH_LIMIT), None
+        else:
+            fetch_page = self._page_source()
+
+            def load():
+                with phase('refresh_tasks.query'):
+                    return fetch_page(None, self.model.PAGE_SIZE), fetch_page
+        self._changes_during_load = []
+        self.runner.submit(load)
+
+    @property
+    def loading(self) -> bool:
+        return self._changes_during_load is not None
+
+    def on_tasks_loaded(self, generation, result):
+        if generation != self.runner.generation:
+            return  # пока сигнал шёл, фильтр или сортировку сменили ещё раз
+        tasks, fetch_page = result
+        changes, self._changes_during_load = self._changes_during_load or [], None
+        with phase('refresh_tasks.set_tasks'):
+            self.model.set_tasks(tasks, self.current_filter, self.current_sort, fetch_page,
+                                 ordered=fetch_page is not None)
+        # результат мог быть прочитан до этих изменений
+        if fetch_page is not None:
+            for change in changes:
+                self.model.apply_changes(change)
+
+    def _page_source(self):
+        # строки подгружаются страницами по мере прокрутки: из индексов
+        # в памяти, когда репозиторий загружен, иначе keyset-запросом к базе
+        completed_filter, sort_by = self.current_filter, self.current_sort
+        if self.repository.loaded:
+            source = self.repository
+            return lambda after, limit: source.page(completed_filter, sort_by, after, limit)
+        return lambda after, limit: get_tasks_page(completed_filter, sort_by, after, limit)
+
+    def on_tasks_changed(self, changes):
+        if self.search.text().strip():
+            # порядок релевантности не поддерживается точечно — повторяем поиск
+            self.search_timer.start()
+        elif changes.reset:
+            self.refresh_tasks()
+        else:
+            self.model.apply_changes(changes)
+            if self._changes_during_load is not None:
+                self._changes_during_load.append(changes)
+
+    def shutdown(self):
+        # дописывает отложенные правки перед закрытием соединений
+        # и отписывается от уведомлений сервиса
+        remove_change_listener(self._change_listener)
+        self.repository.detach()
+        self.runner.shutdown()
+        self.writer.stop()
\ No newline at end of file
@@ -0,0 +1,241 @@
+# ui/task_model.py
+from dataclasses import replace
+from typing import Callable, Dict, List, Optional
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+from models import Recurrence, Task, TaskChanges
+from services.task_service import (
+    toggle_completed, update_task_text, update_task_priority, set_alarm, task_sort_key, encode_update
+)
+from services.task_repository import bisect_tasks
+from instrumentation import phase
+
+
+class TaskListModel(QAbstractListModel):
+    # Модель хранит только данные задач; строки рисует TaskItemDelegate,
+    # поэтому стоимость зависит от числа видимых строк, а не от размера списка.
+    TaskRole = Qt.ItemDataRole.UserRole + 1
+    PriorityRole = Qt.ItemDataRole.UserRole + 2
+    AlarmRole = Qt.ItemDataRole.UserRole + 3
+
+    PAGE_SIZE = 100
+    # больше изменений за раз (пакетные операции) — список пересобирается
+    # в памяти и сбрасывается одним сигналом вместо сигналов на каждую строку
+    BULK_CHANGES = 100
+
+    def __init__(self, parent=None, writer=None):
+        super().__init__(parent)
+        # writer — services.write_queue.WriteQueue: если задан, правки
+        # пишутся в фоне, а строка обновляется сразу, не дожидаясь базы
+        self.writer = writer
+        self._tasks: List[Task] = []
+        self._by_id: Dict[int, Task] = {}
+        self.completed_filter: Optional[bool] = None
+        self.sort_by = 'priority'
+        self._sort_key = task_sort_key(self.sort_by)
+        self._fetch_page: Optional[Callable] = None
+        self._has_more = False
+        self._ordered = True
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._tasks)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        task = self._tasks[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return task.text
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if task.completed else Qt.CheckState.Unchecked
+        if role == self.TaskRole:
+            return task
+        if role == self.PriorityRole:
+            return task.priority
+        if role == self.AlarmRole:
+            return task.alarm_time
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        # Строка обновится через apply_changes, когда сервис сообщит об изменении.
+        if not index.isValid():
+            return False
+        task = self._tasks[index.row()]
+        if role == Qt.ItemDataRole.EditRole:
+            text = value.strip()
+            if not text or text == task.text:
+                return False
+            field, value = 'text', text
+        elif role == Qt.ItemDataRole.CheckStateRole:
+            field, value = 'completed', Qt.CheckState(value) == Qt.CheckState.Checked
+        elif role == self.PriorityRole:
+            field = 'priority'
+        elif role == self.AlarmRole:
+            field = 'alarm_time'
+        else:
+            return False
+        if self.writer is not None:
+            self.writer.enqueue(task.id, field, value)
+            # уведомление от потока записи придёт позже с теми же данными
+            task = replace(task, **{field: encode_update(field, value)})
+            if self._ordered:
+                self.apply_changes(TaskChanges(updated=[task]))
+            else:
+                self._tasks[index.row()] = task
+                self._by_id[task.id] = task
+                self.dataChanged.emit(index, index)
+        elif field == 'text':
+            update_task_text(task.id, value)
+        elif field == 'completed':
+            toggle_completed(task.id, value)
+        elif field == 'priority':
+            update_task_priority(task.id, value)
+        else:
+            set_alarm(task.id, value)
+        return True
+
+    def set_task_alarm(self, task_id: int, alarm_time, recurrence: Optional[Recurrence] = None):
+        # будильник вместе с правилом повторения пишется сразу, мимо очереди
+        # записи; строка обновится по уведомлению. По id, а не по строке:
+        # пока открыт диалог, строки могли сдвинуться
+        try:
+            if self.writer is not None:
+                self.writer.flush()  # правки строки, ещё не записанные в базу
+            set_alarm(task_id, alarm_time, recurrence)
+        except Exception as e:
+            print(f"Ошибка при установке будильника: {e}")
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return (Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+                | Qt.ItemFlag.ItemIsEditable | Qt.ItemFlag.ItemIsUserCheckable)
+
+    def set_tasks(self, tasks: List[Task], completed_filter: Optional[bool] = None,
+                  sort_by: str = 'priority', fetch_page: Callable = None, ordered: bool = True):
+        # tasks должны быть уже упорядочены по task_sort_key(sort_by);
+        # ordered=False — порядок свой (например, релевантность поиска),
+        # тогда строки меняются на месте, а apply_changes не применяется.
+        # fetch_page(after, limit) — источник следующих строк: если задан,
+        # остальное догружается страницами по мере прокрутки (fetchMore).
+        self.beginResetModel()
+        self.completed_filter = completed_filter
+        self.sort_by = sort_by
+        self._sort_key = task_sort_key(sort_by)
+        self._tasks = list(tasks)
+        self._by_id = {task.id: task for task in self._tasks}
+        self._fetch_page = fetch_page
+        # заранее прочитанная первая страница короче PAGE_SIZE — догружать нечего
+        self._has_more = fetch_page is not None and (not self._tasks or len(self._tasks) >= self.PAGE_SIZE)
+        self._ordered = ordered
+        if self._has_more and not self._tasks:
+            self._append_page()
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._has_more:
+            return
+        with phase('task_model.fetch_more'):
+            self._append_page(notify=True)
+
+    def _append_page(self, notify=False):
+        after = self._sort_key(self._tasks[-1]) if self._tasks else None
+        page = self._fetch_page(after, self.PAGE_SIZE)
+        if len(page) < self.PAGE_SIZE:
+            self._has_more = False
+        page = [task for task in page if task.id not in self._by_id]
+        if not page:
+            return
+        first = len(self._tasks)
+        if notify:
+            self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._tasks.extend(page)
+        self._by_id.update((task.id, task) for task in page)
+        if notify:
+            self.endInsertRows()
+
+    def task(self, row: int) -> Optional[Task]:
+        if 0 <= row < len(self._tasks):
+            return self._tasks[row]
+        return None
+
+    def row_of(self, task_id: int) -> int:
+        task = self._by_id.get(task_id)
+        if task is None:
+            return -1
+        return bisect_tasks(self._tasks, self._sort_key(task), self._sort_key)
+
+    def apply_changes(self, changes: TaskChanges):
+        # Точечные вставки/удаления/перемещения строк вместо полной перезагрузки.
+        if not self._ordered:
+            return  # результаты поиска перечитываются целиком
+        if len(changes.deleted) + len(changes.inserted) + len(changes.updated) > self.BULK_CHANGES:
+            self._apply_bulk(changes)
+            return
+        for task_id in changes.deleted:
+            self._remove(task_id)
+        for task in changes.inserted + changes.updated:
+            if self.completed_filter is not None and task.completed != self.completed_filter:
+                self._remove(task.id)
+            elif task.id in self._by_id:
+                self._update(task)
+            else:
+                self._insert(task)
+
+    def _apply_bulk(self, changes: TaskChanges):
+        changed = {task.id: task for task in changes.inserted + changes.updated}
+        removed = set(changes.deleted) | changed.keys()
+        tasks = [task for task in self._tasks if task.id not in removed]
+        # как в _insert: строки за пределами загруженной части придут со следующей страницей
+        last_key = self._sort_key(self._tasks[-1]) if self._has_more and self._tasks else None
+        for task in changed.values():
+            if self.completed_filter is not None and task.completed != self.completed_filter:
+                continue
+            if last_key is not None and self._sort_key(task) > last_key:
+                continue
+            tasks.append(task)
+        tasks.sort(key=self._sort_key)
+        self.beginResetModel()
+        self._tasks = tasks
+        self._by_id = {task.id: task for task in tasks}
+        self.endResetModel()
+
+    def _insert(self, task: Task):
+        row = bisect_tasks(self._tasks, self._sort_key(task), self._sort_key)
+        if self._has_more and row >= len(self._tasks):
+            return  # строка за пределами загруженной части — придёт со следующей страницей
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._tasks.insert(row, task)
+        self._by_id[task.id] = task
+        self.endInsertRows()
+
+    def _remove(self, task_id: int):
+        row = self.row_of(task_id)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._tasks[row]
+        del self._by_id[task_id]
+        self.endRemoveRows()
+
+    def _update(self, task: Task):
+        row = self.row_of(task.id)
+        key = self._sort_key(task)
+        if key != self._sort_key(self._tasks[row]):
+            # позиция в текущем списке (старая строка ещё на месте)
+            dest = bisect_tasks(self._tasks, key, self._sort_key)
+            if self._has_more and dest >= len(self._tasks):
+                self._remove(task.id)  # ушла за пределы загруженной части
+                return
+            if dest not in (row, row + 1):
+                self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), dest)
+                del self._tasks[row]
+                row = dest if dest < row else dest - 1
+                self._tasks.insert(row, task)
+                self.endMoveRows()
+        self._by_id[task.id] = task
+        self._tasks[row] = task
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
\ No newline at end of file
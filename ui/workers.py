@@ -0,0 +1,163 @@
+# ui/workers.py
+import threading
+from typing import Callable
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from database import init_db, get_connection, maintain
+from instrumentation import mark_startup
+from services.task_service import get_overdue_alarms
+
+
+class StartupWorker(QThread):
+    # миграции схемы, первая страница списка и проверка просроченных
+    # будильников — вне GUI-потока, чтобы окно показалось сразу
+    loaded = pyqtSignal(object, int)  # первая страница, число просроченных задач
+    failed = pyqtSignal(str)
+
+    def __init__(self, first_page: Callable, parent=None):
+        super().__init__(parent)
+        self.first_page = first_page
+
+    def run(self):
+        try:
+            init_db()
+            mark_startup('database_ready')
+            page = self.first_page()
+            overdue = len(get_overdue_alarms())
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.loaded.emit(page, overdue)
+
+
+class ImportWorker(QThread):
+    progress = pyqtSignal(int, int)  # обработано задач, процент
+    succeeded = pyqtSignal(object)  # models.ImportResult
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_path: str, mode: str = 'skip', parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.mode = mode  # см. import_service.IMPORT_MODES
+
+    def run(self):
+        from services.import_service import import_tasks  # нужен только при импорте
+        try:
+            result = import_tasks(
+                self.file_path,
+                progress=lambda done, fraction: self.progress.emit(done, int(fraction * 100)),
+                mode=self.mode
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(result)
+
+
+class ExportWorker(QThread):
+    progress = pyqtSignal(int, int)  # экспортировано задач, процент
+    succeeded = pyqtSignal(int)  # всего экспортировано
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_path: str, completed_filter=None, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.completed_filter = completed_filter
+
+    def run(self):
+        from services.export_service import export_tasks  # нужен только при экспорте
+        try:
+            count = export_tasks(
+                self.file_path, self.completed_filter,
+                progress=lambda done, fraction: self.progress.emit(done, int(fraction * 100))
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(count)
+
+
+class MaintenanceWorker(QThread):
+    # архивация старых завершённых задач, затем incremental_vacuum и статистика
+    succeeded = pyqtSignal(int)  # перенесено в архив
+    failed = pyqtSignal(str)
+
+    # после архивации такой доли таблицы статистику пересчитываем полностью
+    ANALYZE_RATIO = 0.1
+
+    def run(self):
+        from services.archive_service import archive_completed  # нужен только здесь
+        try:
+            total = get_connection().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+            archived = archive_completed()
+            maintain(analyze=archived > total * self.ANALYZE_RATIO)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(archived)
+
+
+class QueryRunner(QObject):
+    # Загрузка списка в пуле потоков. Каждый запрос получает номер поколения;
+    # новый запрос отменяет старые: ещё не начатые пропускаются, выполняющиеся
+    # прерываются через sqlite3.Connection.interrupt, а их результат
+    # отбрасывается. Сигналы доставляются в GUI-поток.
+    finished = pyqtSignal(int, object)  # поколение, результат
+    failed = pyqtSignal(int, str)
+
+    MAX_THREADS = 2  # прерванный запрос может ещё завершаться, пока идёт новый
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = None  # создаётся первым запросом: concurrent.futures не нужен при запуске
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._running = {}  # поколение -> соединение потока, выполняющего запрос
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def submit(self, query: Callable) -> int:
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._interrupt_stale()
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(self.MAX_THREADS, thread_name_prefix="task-query")
+        self._pool.submit(self._run, generation, query)
+        return generation
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            self._interrupt_stale()
+
+    def shutdown(self):
+        self.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def _interrupt_stale(self):
+        for generation, conn in self._running.items():
+            if generation != self._generation:
+                conn.interrupt()
+
+    def _run(self, generation, query):
+        conn = get_connection()
+        with self._lock:
+            if generation != self._generation:
+                return  # устарел, пока ждал в очереди
+            self._running[generation] = conn
+        try:
+            result = query()
+        except Exception as e:
+            # у прерванного устаревшего запроса здесь "interrupted" — молча отбрасываем
+            if generation == self._generation:
+                self.failed.emit(generation, str(e))
+        else:
+            if generation == self._generation:
+                self.finished.emit(generation, result)
+        finally:
+            with self._lock:
+                del self._running[generation]
\ No newline at end of file